@@ -1,2 +1,8 @@
 """Weight Tracker Backend API."""
+from dotenv import load_dotenv
+
+# Load .env (relative to the working directory) into os.environ once per process;
+# settings classes then read only the environment instead of re-parsing the file.
+load_dotenv(".env", override=False)
+
 __version__ = "1.0.0"
@@ -7,12 +7,16 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only, raiseload
 
 from .config import settings
 from .database import get_db
 from . import models, schemas
 
+# JWT settings bound once at import (settings are frozen)
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -46,10 +50,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+        expire = datetime.utcnow() + settings.access_token_expire_delta
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -68,32 +72,76 @@ def authenticate_user(db: Session, name: str, password: str) -> Optional[models.
     return user
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _user_id_from_token(token: str) -> int:
+    """Decode a bearer token and return its user id, or raise 401."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")  # Get as string
         if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)  # Convert to int
+            raise _credentials_exception()
+        return int(user_id)  # Convert to int
     except (JWTError, ValueError):  # Catch ValueError too
-        raise credentials_exception
+        raise _credentials_exception()
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> models.User:
+    user_id = _user_id_from_token(token)
     
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
     return user
 
 
+# Profile columns the chat orchestrator and agents read from the user
+_AGENT_USER_COLUMNS = (
+    models.User.id,
+    models.User.name,
+    models.User.email,
+    models.User.sex,
+    models.User.height,
+    models.User.activity_level,
+    models.User.is_admin,
+    models.User.date_of_birth,
+    models.User.timezone,
+    models.User.created_at,
+    models.User.updated_at,
+)
+
+
+async def get_agent_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """
+    Current user loaded for the chat agents.
+
+    Agents assume the profile columns above are already loaded; only those are
+    fetched. In debug mode any relationship access raises instead of silently
+    issuing a lazy SELECT per agent call.
+    """
+    user_id = _user_id_from_token(token)
+    options = [load_only(*_AGENT_USER_COLUMNS)]
+    if settings.debug:
+        options.append(raiseload("*"))
+    user = db.get(models.User, user_id, options=options)
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
 async def get_current_admin_user(
     current_user: models.User = Depends(get_current_user)
 ) -> models.User:
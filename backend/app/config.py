@@ -2,10 +2,24 @@
 Configuration settings for the Weight Tracker backend.
 Uses pydantic-settings for type-safe environment variable management.
 """
+from datetime import timedelta
+from functools import cached_property, lru_cache
 from typing import Optional
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+__all__ = ("settings", "get_settings")
+
+
+# Pydantic v2 settings config shared by all settings groups
+# (.env is loaded into os.environ once by the app package, so no env_file here)
+_ENV_CONFIG = SettingsConfigDict(
+    env_file=None,
+    case_sensitive=False,
+    extra="ignore",  # Ignore extra env vars so unexpected keys don't crash
+    frozen=True,  # Settings are read-only after load, so cached values stay valid
+)
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -19,12 +33,24 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    # Pool sizing: roughly peak concurrent requests, with overflow for bursts. A chat
+    # turn holds one connection, plus one per parallel read-only tool call while
+    # they fan out (llm.tool_concurrency_limit, capped by the pool's free capacity)
+    db_pool_size: int = 10
+    db_max_overflow: int = 5
+    db_pool_recycle: int = 1800  # seconds; stay under server/proxy idle timeouts
+    db_pool_prewarm: int = 5  # connections opened at startup (capped at db_pool_size)
 
     # Security
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7  # 7 days
 
+    @cached_property
+    def access_token_expire_delta(self) -> timedelta:
+        """Default JWT lifetime as a timedelta (built once)."""
+        return timedelta(minutes=self.access_token_expire_minutes)
+
     # CORS - comma-separated list in environment variable
     # Example: CORS_ORIGINS="http://localhost:5173,http://localhost:3000,https://agentic-health-tracker.vercel.app"
     cors_origins_str: str = Field(
@@ -32,21 +58,16 @@ class Settings(BaseSettings):
         validation_alias="CORS_ORIGINS"
     )
 
-    @property
-    def cors_origins(self) -> list[str]:
-        """Parse CORS origins from comma-separated string."""
-        return [origin.strip() for origin in self.cors_origins_str.split(",") if origin.strip()]
-
-    # OpenAI
-    openai_api_key: Optional[str] = None
-    # Optional model id from env (e.g., model_id=gpt-4o)
-    model_id: Optional[str] = None
+    @cached_property
+    def cors_origins(self) -> tuple[str, ...]:
+        """Parse CORS origins from comma-separated string into an immutable tuple."""
+        return tuple(origin.strip() for origin in self.cors_origins_str.split(",") if origin.strip())
 
-    # Email Configuration (using Brevo HTTP API)
-    # Sign up at https://www.brevo.com/ and get API key from Settings > API Keys
-    brevo_api_key: Optional[str] = None  # Your Brevo API key
-    email_from: Optional[str] = None  # Email address to send from (must be verified in Brevo)
-    email_from_name: str = "Weight Tracker"
+    @model_validator(mode="after")
+    def _parse_cors_origins(self) -> "Settings":
+        # Parse once at load time so request paths only do an attribute read
+        self.cors_origins
+        return self
 
     # Frontend URL (for password reset links)
     frontend_url: str = "https://agentic-health-tracker.vercel.app"
@@ -55,13 +76,50 @@ class Settings(BaseSettings):
     default_page_size: int = 20
     max_page_size: int = 100
 
-    # Pydantic v2 settings config
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        case_sensitive=False,
-        extra="ignore",  # Ignore extra env vars so unexpected keys don't crash
-    )
+    # Optional subsystems are only read from the environment on first access,
+    # so requests that never send email or call OpenAI skip their validation.
+    @cached_property
+    def email(self) -> "EmailSettings":
+        """Email (Brevo) settings, loaded lazily."""
+        return EmailSettings()
+
+    @cached_property
+    def llm(self) -> "LLMSettings":
+        """OpenAI settings, loaded lazily."""
+        return LLMSettings()
+
+    model_config = _ENV_CONFIG
+
+
+class EmailSettings(BaseSettings):
+    """Email configuration (using Brevo HTTP API)."""
+
+    # Sign up at https://www.brevo.com/ and get API key from Settings > API Keys
+    brevo_api_key: Optional[str] = None  # Your Brevo API key
+    email_from: Optional[str] = None  # Email address to send from (must be verified in Brevo)
+    email_from_name: str = "Weight Tracker"
+
+    model_config = _ENV_CONFIG
+
+
+class LLMSettings(BaseSettings):
+    """OpenAI configuration for the chat assistants."""
+
+    openai_api_key: Optional[str] = None
+    # Optional model id from env (e.g., model_id=gpt-4o)
+    model_id: Optional[str] = None
+    # Read-only tool calls from one model turn that may run at once (1 = serial)
+    tool_concurrency_limit: int = 4
+
+    # model_id is a real env var name, not pydantic's reserved model_ namespace
+    model_config = SettingsConfigDict(**_ENV_CONFIG, protected_namespaces=())
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings instance, parsing the environment only once."""
+    return Settings()
 
 
-# Global settings instance
-settings = Settings()
+# Global settings instance (kept for existing `from .config import settings` imports)
+settings = get_settings()
@@ -1,18 +1,57 @@
 """
 Database configuration and session management.
 """
+from typing import Optional
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+# Queue pool tuning (not applicable to SQLite's pools)
+_pool_kwargs = {}
+if not settings.database_url.startswith("sqlite"):
+    _pool_kwargs = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        # Reuse the most recently returned connection so a small hot set stays
+        # busy and idle overflow connections can time out
+        "pool_use_lifo": True,
+    }
+
 # Create database engine
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verify connections before using
     echo=settings.debug,  # Log SQL queries in debug mode
+    **_pool_kwargs,
 )
 
+
+def prewarm_pool() -> None:
+    """Open pooled connections at startup so the first requests skip connect latency."""
+    if not _pool_kwargs:
+        return
+    conns = []
+    try:
+        for _ in range(min(settings.db_pool_prewarm, settings.db_pool_size)):
+            conns.append(engine.connect())
+    except Exception as e:
+        print(f"Pool prewarm note: {e}")
+    finally:
+        # Closing returns them to the pool, where they stay open for reuse
+        for conn in conns:
+            conn.close()
+
+
+def pool_headroom() -> Optional[int]:
+    """Connections that can be checked out right now without waiting; None for SQLite's unbounded pools."""
+    if not _pool_kwargs:
+        return None
+    return max(0, settings.db_pool_size + settings.db_max_overflow - engine.pool.checkedout())
+
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -2,103 +2,76 @@
 Email utility functions for sending emails via Brevo HTTP API.
 Uses HTTP API instead of SMTP to avoid firewall/port blocking issues.
 """
-import requests
-from typing import Optional
+import html
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 import logging
 
-from .config import settings
-
-logger = logging.getLogger(__name__)
+import orjson
+import urllib3
+from urllib3.util.retry import Retry
 
+from .config import get_settings
 
-def send_email(
-    to_email: str,
-    subject: str,
-    body_html: str,
-    body_text: Optional[str] = None
-) -> bool:
-    """
-    Send an email using Brevo HTTP API.
-
-    Args:
-        to_email: Recipient email address
-        subject: Email subject line
-        body_html: HTML content of the email
-        body_text: Plain text alternative (optional)
+logger = logging.getLogger(__name__)
 
-    Returns:
-        True if email sent successfully, False otherwise
-    """
-    # Check if Brevo is configured
-    if not settings.brevo_api_key:
-        logger.info("Brevo not configured. Set BREVO_API_KEY environment variable.")
-        return False
+# Shared connection pool so consecutive sends reuse the TCP/TLS connection to Brevo
+_HTTP = urllib3.PoolManager(
+    num_pools=1,
+    maxsize=4,
+    timeout=urllib3.Timeout(connect=3, read=10),
+    retries=Retry(
+        total=2,
+        backoff_factor=0.1,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+)
 
-    if not settings.email_from:
-        logger.warning("EMAIL_FROM not set. Please configure sender email address.")
-        return False
 
-    logger.info(f"Attempting to send email to {to_email} via Brevo API")
+# Brevo API endpoint
+_BREVO_URL = "https://api.brevo.com/v3/smtp/email"
 
-    # Brevo API endpoint
-    url = "https://api.brevo.com/v3/smtp/email"
 
-    # Request headers
-    headers = {
-        "accept": "application/json",
-        "api-key": settings.brevo_api_key,
-        "content-type": "application/json"
-    }
+@lru_cache(maxsize=1)
+def _bound_settings() -> Tuple[Optional[str], Optional[str], Dict[str, str]]:
+    """
+    Read the email settings once and bind what send_email needs.
 
-    # Email payload
-    payload = {
-        "sender": {
-            "name": settings.email_from_name,
-            "email": settings.email_from
-        },
-        "to": [
-            {
-                "email": to_email,
-                "name": to_email.split('@')[0]  # Use email username as display name
-            }
-        ],
-        "subject": subject,
-        "htmlContent": body_html
+    Returns (api_key, email_from, sender). After changing settings,
+    call get_settings.cache_clear(), _bound_settings.cache_clear(),
+    _email_configured.cache_clear() and _build_headers.cache_clear().
+    """
+    email = get_settings().email
+    sender = {
+        "name": email.email_from_name,
+        "email": email.email_from
     }
+    return email.brevo_api_key, email.email_from, sender
 
-    # Add text content if provided
-    if body_text:
-        payload["textContent"] = body_text
-
-    try:
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
-
-        if response.status_code == 201:
-            logger.info(f"Email sent successfully to {to_email} via Brevo")
-            return True
-        else:
-            logger.error(f"Brevo API error: {response.status_code} - {response.text}")
-            return False
-
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {str(e)}")
-        return False
 
+@lru_cache(maxsize=1)
+def _email_configured() -> bool:
+    """True when both the Brevo API key and sender address are set."""
+    api_key, email_from, _ = _bound_settings()
+    return bool(api_key and email_from)
 
-def send_username_recovery_email(to_email: str, username: str) -> bool:
-    """
-    Send username recovery email.
 
-    Args:
-        to_email: User's email address
-        username: User's username
+@lru_cache(maxsize=1)
+def _build_headers() -> Mapping[str, str]:
+    """Brevo request headers, built on first send and shared read-only afterwards."""
+    api_key, _, _ = _bound_settings()
+    return MappingProxyType({
+        "accept": "application/json",
+        "api-key": api_key or "",
+        "content-type": "application/json"
+    })
 
-    Returns:
-        True if email sent successfully, False otherwise
-    """
-    subject = "Your Weight Tracker Username"
 
-    body_html = f"""
+# Email templates (str.format_map placeholders); only the per-user values are filled in per send.
+_USERNAME_HTML_TMPL = """
     <html>
         <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
             <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0;">
@@ -127,7 +100,7 @@ def send_username_recovery_email(to_email: str, username: str) -> bool:
     </html>
     """
 
-    body_text = f"""
+_USERNAME_TEXT_TMPL = """
     Weight Tracker - Username Recovery
 
     You requested to retrieve your username for your Weight Tracker account.
@@ -139,23 +112,7 @@ def send_username_recovery_email(to_email: str, username: str) -> bool:
     If you didn't request this information, please ignore this email.
     """
 
-    return send_email(to_email, subject, body_html, body_text)
-
-
-def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
-    """
-    Send password reset link email.
-
-    Args:
-        to_email: User's email address
-        reset_url: Full URL with reset token
-
-    Returns:
-        True if email sent successfully, False otherwise
-    """
-    subject = "Reset Your Weight Tracker Password"
-
-    body_html = f"""
+_RESET_LINK_HTML_TMPL = """
     <html>
         <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
             <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0;">
@@ -170,7 +127,7 @@ def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
                     Click the button below to reset your password. This link will expire in 15 minutes.
                 </p>
                 <div style="text-align: center; margin: 30px 0;">
-                    <a href="{reset_url}" style="display: inline-block; padding: 15px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px;">
+                    <a href="{reset_url_escaped}" style="display: inline-block; padding: 15px 40px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px;">
                         Reset Password
                     </a>
                 </div>
@@ -178,7 +135,7 @@ def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
                     Or copy and paste this link into your browser:
                 </p>
                 <p style="color: #667eea; font-size: 12px; word-break: break-all; background: white; padding: 10px; border-radius: 4px; border: 1px solid #ddd;">
-                    {reset_url}
+                    {reset_url_escaped}
                 </p>
                 <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
                 <p style="color: #999; font-size: 12px; line-height: 1.6;">
@@ -192,7 +149,7 @@ def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
     </html>
     """
 
-    body_text = f"""
+_RESET_LINK_TEXT_TMPL = """
     Weight Tracker - Password Reset Request
 
     You requested to reset your password for your Weight Tracker account.
@@ -203,23 +160,7 @@ def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
     If you didn't request this password reset, please ignore this email.
     """
 
-    return send_email(to_email, subject, body_html, body_text)
-
-
-def send_password_reset_confirmation_email(to_email: str, username: str) -> bool:
-    """
-    Send password reset confirmation email.
-
-    Args:
-        to_email: User's email address
-        username: User's username
-
-    Returns:
-        True if email sent successfully, False otherwise
-    """
-    subject = "Your Password Has Been Reset"
-
-    body_html = f"""
+_RESET_CONFIRM_HTML_TMPL = """
     <html>
         <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
             <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; border-radius: 10px 10px 0 0;">
@@ -242,7 +183,7 @@ def send_password_reset_confirmation_email(to_email: str, username: str) -> bool
     </html>
     """
 
-    body_text = f"""
+_RESET_CONFIRM_TEXT_TMPL = """
     Weight Tracker - Password Reset Successful
 
     Your password for username {username} has been successfully reset.
@@ -252,4 +193,150 @@ def send_password_reset_confirmation_email(to_email: str, username: str) -> bool
     If you didn't make this change, please contact support immediately.
     """
 
+# Templates whose only variable is the username, keyed by template id
+_USERNAME_TEMPLATES = {
+    "username_recovery": (_USERNAME_HTML_TMPL, _USERNAME_TEXT_TMPL),
+    "reset_confirmation": (_RESET_CONFIRM_HTML_TMPL, _RESET_CONFIRM_TEXT_TMPL),
+}
+
+
+@lru_cache(maxsize=128)
+def _render_username_bodies(template_id: str, username: str) -> Tuple[str, str]:
+    """Render (html, text) bodies for a username-only template; repeat sends reuse the result."""
+    html_tmpl, text_tmpl = _USERNAME_TEMPLATES[template_id]
+    return (
+        html_tmpl.format_map({"username": html.escape(username, quote=True)}),
+        text_tmpl.format_map({"username": username}),
+    )
+
+
+def send_email(
+    to_email: str,
+    subject: str,
+    body_html: str,
+    body_text: Optional[str] = None
+) -> bool:
+    """
+    Send an email using Brevo HTTP API.
+
+    Args:
+        to_email: Recipient email address
+        subject: Email subject line
+        body_html: HTML content of the email
+        body_text: Plain text alternative (optional)
+
+    Returns:
+        True if email sent successfully, False otherwise
+    """
+    api_key, email_from, sender = _bound_settings()
+
+    # Check if Brevo is configured
+    if not api_key:
+        logger.info("Brevo not configured. Set BREVO_API_KEY environment variable.")
+        return False
+
+    if not email_from:
+        logger.warning("EMAIL_FROM not set. Please configure sender email address.")
+        return False
+
+    logger.info("Attempting to send email to %s via Brevo API", to_email)
+
+    # Email payload
+    payload = {
+        "sender": sender,
+        "to": [
+            {
+                "email": to_email,
+                "name": to_email.split('@')[0]  # Use email username as display name
+            }
+        ],
+        "subject": subject,
+        "htmlContent": body_html
+    }
+
+    # Add text content if provided
+    if body_text:
+        payload["textContent"] = body_text
+
+    try:
+        response = _HTTP.request("POST", _BREVO_URL, body=orjson.dumps(payload), headers=_build_headers())
+
+        if response.status == 201:
+            logger.info("Email sent successfully to %s via Brevo", to_email)
+            return True
+        else:
+            logger.error("Brevo API error: %s - %s", response.status, response.data.decode("utf-8", "replace"))
+            return False
+
+    except Exception as e:
+        logger.error("Failed to send email to %s: %s", to_email, e)
+        return False
+
+
+def send_username_recovery_email(to_email: str, username: str) -> bool:
+    """
+    Send username recovery email.
+
+    Args:
+        to_email: User's email address
+        username: User's username
+
+    Returns:
+        True if email sent successfully, False otherwise
+    """
+    if not _email_configured():
+        logger.info("Email not configured; skipping.")
+        return False
+
+    subject = "Your Weight Tracker Username"
+
+    body_html, body_text = _render_username_bodies("username_recovery", username)
+
+    return send_email(to_email, subject, body_html, body_text)
+
+
+def send_password_reset_link_email(to_email: str, reset_url: str) -> bool:
+    """
+    Send password reset link email.
+
+    Args:
+        to_email: User's email address
+        reset_url: Full URL with reset token
+
+    Returns:
+        True if email sent successfully, False otherwise
+    """
+    if not _email_configured():
+        logger.info("Email not configured; skipping.")
+        return False
+
+    subject = "Reset Your Weight Tracker Password"
+
+    # Escape once; the HTML template uses the URL for both the button and the copyable link
+    body_html = _RESET_LINK_HTML_TMPL.format_map({"reset_url_escaped": html.escape(reset_url, quote=True)})
+
+    body_text = _RESET_LINK_TEXT_TMPL.format_map({"reset_url": reset_url})
+
+    return send_email(to_email, subject, body_html, body_text)
+
+
+def send_password_reset_confirmation_email(to_email: str, username: str) -> bool:
+    """
+    Send password reset confirmation email.
+
+    Args:
+        to_email: User's email address
+        username: User's username
+
+    Returns:
+        True if email sent successfully, False otherwise
+    """
+    if not _email_configured():
+        logger.info("Email not configured; skipping.")
+        return False
+
+    subject = "Your Password Has Been Reset"
+
+    body_html, body_text = _render_username_bodies("reset_confirmation", username)
+
     return send_email(to_email, subject, body_html, body_text)
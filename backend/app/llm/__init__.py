@@ -10,3 +10,27 @@ Agents:
 The orchestrator aggregates agent tools and drives an OpenAI function‑calling loop.
 """
 
+import importlib
+from typing import Any
+
+# Public names resolved on first access (PEP 562), so importing the package
+# does not pull in the OpenAI client or the agent modules until they are used.
+_LAZY = {
+    "BaseAgent": ".agents",
+    "SQLAgent": ".agents",
+    "AnalyticsAgent": ".agents",
+    "ActionAgent": ".agents",
+    "AdminAgent": ".agents",
+    "ChatOrchestrator": ".orchestrator",
+}
+
+__all__ = tuple(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,12 +1,19 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 from datetime import date, timedelta
+from functools import cached_property, lru_cache
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, asc
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Date, Float, Integer, Numeric, Select, String, cast, column, delete, exists, func, insert, inspect, or_, desc, asc, select, literal, true, union_all, update, values
 
 from .. import models
+from ..auth import get_password_hash
 from .tools import (
+    invalidate_user_context,
     parse_date_str,
     safe_float,
     calc_bmi,
@@ -16,337 +23,493 @@ from .tools import (
 )
 
 
+def _numeric_decoder(col) -> Callable[[Any], Optional[float]]:
+    """Pick the cheapest float conversion a column's schema allows.
+
+    NOT NULL Numeric columns always come back as Decimal, so plain ``float`` is
+    enough; anything else keeps the defensive ``safe_float``.
+    """
+    if isinstance(col.type, Numeric) and not col.nullable:
+        return float
+    return safe_float
+
+
+_TARGET_WEIGHT_DECODER = _numeric_decoder(models.TargetWeight.__table__.c.target_weight)
+
+
+_STREAM_BATCH_ROWS = 200
+
+# weights_query output keys, in projection order
+_WEIGHT_ROW_KEYS = ("id", "date", "weight_kg", "body_fat_pct", "muscle_mass", "notes")
+
+# Weight columns user_update_weight copies straight from tool args
+# (date_of_measurement is parsed and validated separately)
+_WEIGHT_UPDATABLE = frozenset({"weight", "body_fat_percentage", "muscle_mass", "notes"})
+
+# Rate conversions for weight-change summaries (mean Gregorian month)
+_DAYS_PER_WEEK, _DAYS_PER_MONTH = 7.0, 30.4375
+
+
+def _iso_date(col):
+    """Project a Date column as its ISO string, formatted by Postgres rather than per row."""
+    return func.to_char(col, "YYYY-MM-DD")
+
+
+# Session.info key holding read-tool results for the current request/session
+_READ_CACHE_KEY = "agent_read_cache"
+
+
+def invalidate_read_cache(db: Session) -> None:
+    """Drop memoized read-tool results after a write on this session."""
+    db.info.pop(_READ_CACHE_KEY, None)
+
+
+def session_read_cache(db: Session) -> Dict[tuple, Any]:
+    """Memoized read-tool results for this session."""
+    return db.info.setdefault(_READ_CACHE_KEY, {})
+
+
+def share_read_cache(db: Session, cache: Dict[tuple, Any]) -> None:
+    """Make ``db`` use ``cache`` (another session serving the same request)."""
+    db.info[_READ_CACHE_KEY] = cache
+
+
 class BaseAgent:
     name: str = "agent"
+    # True when no tool mutates state, so calls may run on a separate session
+    read_only: bool = False
+    db: Session
+    user: models.User
+
+    @cached_property
+    def _weights_base(self) -> Select:
+        """``SELECT ... FROM weights WHERE user_id = :me``; branches narrow it with
+        ``with_only_columns`` / ``where`` instead of rebuilding the filter."""
+        return select(models.Weight).where(models.Weight.user_id == self.user.id)
+
+    def _read_cache(self) -> Dict[tuple, Any]:
+        # Lives on the session, so it is scoped to one request and shared by every
+        # agent the orchestrator builds for it (ActionAgent clears it on writes).
+        return session_read_cache(self.db)
 
-    def tools(self) -> List[Dict[str, Any]]:
-        return []
+    def _memoized(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run a read-only tool through ``_execute``, reusing identical earlier calls."""
+        cache = self._read_cache()
+        key = (self.name, self.user.id, tool_name, json.dumps(args, sort_keys=True, default=str))
+        if key in cache:
+            return cache[key]
+        result = self._execute(tool_name, args)
+        if result is not None:
+            cache[key] = result
+        return result
+
+    # tool name -> unbound handler; subclasses fill this in after their _do_* methods
+    _DISPATCH: Dict[str, Callable[[Any, Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+
+    def _execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        fn = self._DISPATCH.get(tool_name)
+        return fn(self, args) if fn else None
+
+    def tools(self) -> Sequence[Dict[str, Any]]:
+        return ()
 
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         return None
 
 
+_SQL_AGENT_TOOLS: Tuple[Dict[str, Any], ...] = (
+    {
+        "type": "function",
+        "function": {
+            "name": "weights_query",
+            "description": "Query weight entries with filters and sorting for the current user (or specific user if admin).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_from": {"type": ["string", "null"]},
+                    "date_to": {"type": ["string", "null"]},
+                    "sort_by": {"type": ["string", "null"], "enum": ["date", "weight"]},
+                    "order": {"type": ["string", "null"], "enum": ["asc", "desc"]},
+                    "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "weights_aggregate",
+            "description": "Aggregate over weights: max|min|avg|count, optionally within date range.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "op": {"type": "string", "enum": ["max", "min", "avg", "count"]},
+                    "date_from": {"type": ["string", "null"]},
+                    "date_to": {"type": ["string", "null"]},
+                },
+                "required": ["op"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "targets_query",
+            "description": "Query target entries with filters and sorting for the current user.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
+                    "date_from": {"type": ["string", "null"]},
+                    "date_to": {"type": ["string", "null"]},
+                    "sort_by": {"type": ["string", "null"], "enum": ["created", "target_date"]},
+                    "order": {"type": ["string", "null"], "enum": ["asc", "desc"]},
+                    "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
+                },
+                "required": [],
+            },
+        },
+    },
+)
+
+
 class SQLAgent(BaseAgent):
     name = "sql"
+    read_only = True
 
     def __init__(self, db: Session, user: models.User):
         self.db = db
         self.user = user
 
-    def tools(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "weights_query",
-                    "description": "Query weight entries with filters and sorting for the current user (or specific user if admin).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_from": {"type": ["string", "null"]},
-                            "date_to": {"type": ["string", "null"]},
-                            "sort_by": {"type": ["string", "null"], "enum": ["date", "weight"]},
-                            "order": {"type": ["string", "null"], "enum": ["asc", "desc"]},
-                            "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
-                        },
-                        "required": [],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "weights_aggregate",
-                    "description": "Aggregate over weights: max|min|avg|count, optionally within date range.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "op": {"type": "string", "enum": ["max", "min", "avg", "count"]},
-                            "date_from": {"type": ["string", "null"]},
-                            "date_to": {"type": ["string", "null"]},
-                        },
-                        "required": ["op"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "targets_query",
-                    "description": "Query target entries with filters and sorting for the current user.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
-                            "date_from": {"type": ["string", "null"]},
-                            "date_to": {"type": ["string", "null"]},
-                            "sort_by": {"type": ["string", "null"], "enum": ["created", "target_date"]},
-                            "order": {"type": ["string", "null"], "enum": ["asc", "desc"]},
-                            "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
-                        },
-                        "required": [],
-                    },
-                },
-            },
-        ]
+    def _weights_aggs(self, date_from: Optional[date], date_to: Optional[date]) -> tuple:
+        """count/avg/min/max of the user's weights in a single scan, memoized per range."""
+        cache = self._read_cache()
+        key = ("weights_aggs", self.user.id, date_from, date_to)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        stmt = self._weights_base.with_only_columns(
+            func.count(models.Weight.id),
+            func.avg(models.Weight.weight),
+            func.min(models.Weight.weight),
+            func.max(models.Weight.weight),
+        )
+        if date_from:
+            stmt = stmt.where(models.Weight.date_of_measurement >= date_from)
+        if date_to:
+            stmt = stmt.where(models.Weight.date_of_measurement <= date_to)
+        row = cache[key] = tuple(self.db.execute(stmt).one())
+        return row
+
+    def tools(self) -> Sequence[Dict[str, Any]]:
+        return _SQL_AGENT_TOOLS
 
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        if tool_name == "weights_query":
-            date_from = parse_date_str(args.get("date_from")) if args.get("date_from") else None
-            date_to = parse_date_str(args.get("date_to")) if args.get("date_to") else None
-            q = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id)
-            if date_from:
-                q = q.filter(models.Weight.date_of_measurement >= date_from)
-            if date_to:
-                q = q.filter(models.Weight.date_of_measurement <= date_to)
-            sort_by = args.get("sort_by") or "date"
-            order = args.get("order") or "desc"
-            if sort_by == "weight":
-                q = q.order_by(desc(models.Weight.weight) if order == "desc" else asc(models.Weight.weight))
-            else:
-                q = q.order_by(desc(models.Weight.date_of_measurement) if order == "desc" else asc(models.Weight.date_of_measurement))
-            limit = args.get("limit") or 200
-            rows = q.limit(min(int(limit), 1000)).all()
-            data = [
-                {
-                    "id": r.id,
-                    "date": r.date_of_measurement.isoformat() if r.date_of_measurement else None,
-                    "weight_kg": safe_float(r.weight),
-                    "body_fat_pct": safe_float(r.body_fat_percentage),
-                    "muscle_mass": safe_float(r.muscle_mass),
-                    "notes": r.notes,
-                }
-                for r in rows
-            ]
-            return {"rows": data}
-
-        if tool_name == "weights_aggregate":
-            op = (args.get("op") or "max").lower()
-            date_from = parse_date_str(args.get("date_from")) if args.get("date_from") else None
-            date_to = parse_date_str(args.get("date_to")) if args.get("date_to") else None
-            q = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id)
-            if date_from:
-                q = q.filter(models.Weight.date_of_measurement >= date_from)
-            if date_to:
-                q = q.filter(models.Weight.date_of_measurement <= date_to)
-            if op == "count":
-                return {"op": op, "value": int(q.count())}
-            if op == "avg":
-                val = q.with_entities(func.avg(models.Weight.weight)).scalar()
-                return {"op": op, "value": safe_float(val)}
-            if op == "max":
-                rec = q.order_by(models.Weight.weight.desc(), models.Weight.date_of_measurement.desc()).first()
-                if not rec:
-                    return {"op": op, "value": None}
-                return {"op": op, "value": safe_float(rec.weight), "date": rec.date_of_measurement.isoformat() if rec.date_of_measurement else None, "id": rec.id}
-            if op == "min":
-                rec = q.order_by(models.Weight.weight.asc(), models.Weight.date_of_measurement.desc()).first()
-                if not rec:
-                    return {"op": op, "value": None}
-                return {"op": op, "value": safe_float(rec.weight), "date": rec.date_of_measurement.isoformat() if rec.date_of_measurement else None, "id": rec.id}
+        return self._memoized(tool_name, args)
+
+    def _do_weights_query(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _parse = parse_date_str
+        date_from = _parse(d) if (d := args.get("date_from")) else None
+        date_to = _parse(d) if (d := args.get("date_to")) else None
+        # Select plain columns (no ORM instances) already in their JSON shape: ISO
+        # date strings and float8 numbers, so each row maps straight onto the keys
+        stmt = self._weights_base.with_only_columns(
+            models.Weight.id,
+            _iso_date(models.Weight.date_of_measurement),
+            cast(models.Weight.weight, Float),
+            cast(models.Weight.body_fat_percentage, Float),
+            cast(models.Weight.muscle_mass, Float),
+            models.Weight.notes,
+        )
+        if date_from:
+            stmt = stmt.where(models.Weight.date_of_measurement >= date_from)
+        if date_to:
+            stmt = stmt.where(models.Weight.date_of_measurement <= date_to)
+        sort_by = args.get("sort_by") or "date"
+        order = args.get("order") or "desc"
+        if sort_by == "weight":
+            stmt = stmt.order_by(desc(models.Weight.weight) if order == "desc" else asc(models.Weight.weight))
+        else:
+            stmt = stmt.order_by(desc(models.Weight.date_of_measurement) if order == "desc" else asc(models.Weight.date_of_measurement))
+        limit = args.get("limit") or 200
+        # Stream in batches (server-side cursor) rather than buffering up to 1000 rows
+        rows = self.db.execute(
+            stmt.limit(min(int(limit), 1000)).execution_options(yield_per=_STREAM_BATCH_ROWS)
+        )
+        data = [dict(zip(_WEIGHT_ROW_KEYS, row)) for row in rows]
+        return {"rows": data}
+
+    def _do_weights_aggregate(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _parse = parse_date_str
+        op = (args.get("op") or "max").lower()
+        date_from = _parse(d) if (d := args.get("date_from")) else None
+        date_to = _parse(d) if (d := args.get("date_to")) else None
+        if op not in ("count", "avg", "min", "max"):
             return {"error": f"Unsupported op: {op}"}
+        count, avg_w, min_w, max_w = self._weights_aggs(date_from, date_to)
+        if op == "count":
+            return {"op": op, "value": int(count or 0)}
+        if op == "avg":
+            return {"op": op, "value": safe_float(avg_w)}
+        val = max_w if op == "max" else min_w
+        if val is None:
+            return {"op": op, "value": None}
+        # Resolve id/date of the most recent entry holding the extreme value
+        stmt = (
+            self._weights_base.with_only_columns(models.Weight.id, models.Weight.date_of_measurement)
+            .where(models.Weight.weight == val)
+            .order_by(models.Weight.date_of_measurement.desc())
+            .limit(1)
+        )
+        if date_from:
+            stmt = stmt.where(models.Weight.date_of_measurement >= date_from)
+        if date_to:
+            stmt = stmt.where(models.Weight.date_of_measurement <= date_to)
+        rec = self.db.execute(stmt).first()
+        rid, dom = rec if rec else (None, None)
+        return {"op": op, "value": safe_float(val), "date": dom.isoformat() if dom else None, "id": rid}
 
-        if tool_name == "targets_query":
-            status = args.get("status")
-            date_from = parse_date_str(args.get("date_from")) if args.get("date_from") else None
-            date_to = parse_date_str(args.get("date_to")) if args.get("date_to") else None
-            q = self.db.query(models.TargetWeight).filter(models.TargetWeight.user_id == self.user.id)
-            if status:
-                q = q.filter(models.TargetWeight.status == status)
-            if date_from:
-                q = q.filter(models.TargetWeight.date_of_target >= date_from)
-            if date_to:
-                q = q.filter(models.TargetWeight.date_of_target <= date_to)
-            sort_by = args.get("sort_by") or "created"
-            order = args.get("order") or "desc"
-            if sort_by == "target_date":
-                q = q.order_by(desc(models.TargetWeight.date_of_target) if order == "desc" else asc(models.TargetWeight.date_of_target))
-            else:
-                q = q.order_by(desc(models.TargetWeight.created_date) if order == "desc" else asc(models.TargetWeight.created_date))
-            limit = args.get("limit") or 200
-            rows = q.limit(min(int(limit), 1000)).all()
-            data = [
-                {
-                    "id": r.id,
-                    "created_date": r.created_date.isoformat() if r.created_date else None,
-                    "date_of_target": r.date_of_target.isoformat() if r.date_of_target else None,
-                    "target_weight": safe_float(r.target_weight),
-                    "status": r.status,
-                }
-                for r in rows
-            ]
-            return {"rows": data}
+    def _do_targets_query(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _parse = parse_date_str
+        status = args.get("status")
+        date_from = _parse(d) if (d := args.get("date_from")) else None
+        date_to = _parse(d) if (d := args.get("date_to")) else None
+        stmt = select(
+            models.TargetWeight.id,
+            _iso_date(models.TargetWeight.created_date),
+            _iso_date(models.TargetWeight.date_of_target),
+            models.TargetWeight.target_weight,
+            models.TargetWeight.status,
+        ).where(models.TargetWeight.user_id == self.user.id)
+        if status:
+            stmt = stmt.where(models.TargetWeight.status == status)
+        if date_from:
+            stmt = stmt.where(models.TargetWeight.date_of_target >= date_from)
+        if date_to:
+            stmt = stmt.where(models.TargetWeight.date_of_target <= date_to)
+        sort_by = args.get("sort_by") or "created"
+        order = args.get("order") or "desc"
+        if sort_by == "target_date":
+            stmt = stmt.order_by(desc(models.TargetWeight.date_of_target) if order == "desc" else asc(models.TargetWeight.date_of_target))
+        else:
+            stmt = stmt.order_by(desc(models.TargetWeight.created_date) if order == "desc" else asc(models.TargetWeight.created_date))
+        limit = args.get("limit") or 200
+        rows = self.db.execute(stmt.limit(min(int(limit), 1000))).all()
+        tw_dec = _TARGET_WEIGHT_DECODER
+        data = [
+            {
+                "id": rid,
+                "created_date": created,
+                "date_of_target": dot,
+                "target_weight": tw_dec(tw),
+                "status": st,
+            }
+            for (rid, created, dot, tw, st) in rows
+        ]
+        return {"rows": data}
+
+    _DISPATCH = {
+        "weights_query": _do_weights_query,
+        "weights_aggregate": _do_weights_aggregate,
+        "targets_query": _do_targets_query,
+    }
 
-        return None
+
+_ANALYTICS_AGENT_TOOLS: Tuple[Dict[str, Any], ...] = (
+    {
+        "type": "function",
+        "function": {
+            "name": "user_weight_change_periods",
+            "description": "Compute weight change over given periods (in days). Includes BMI/body-fat/lean estimates when possible.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "periods_days": {
+                        "type": "array",
+                        "items": {"type": "integer", "minimum": 1},
+                    }
+                },
+                "required": ["periods_days"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_avg_weight_change",
+            "description": "Compute average weight change per day/week/month over a date range for the current user.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_from": {"type": "string"},
+                    "date_to": {"type": ["string", "null"]},
+                },
+                "required": ["date_from"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_streaks",
+            "description": "Compute current and longest streaks of consecutive weight-entry days, with start/end dates.",
+            "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    },
+)
 
 
 class AnalyticsAgent(BaseAgent):
     name = "analytics"
+    read_only = True
 
     def __init__(self, db: Session, user: models.User):
         self.db = db
         self.user = user
 
-    def tools(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_weight_change_periods",
-                    "description": "Compute weight change over given periods (in days). Includes BMI/body-fat/lean estimates when possible.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "periods_days": {
-                                "type": "array",
-                                "items": {"type": "integer", "minimum": 1},
-                            }
-                        },
-                        "required": ["periods_days"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_avg_weight_change",
-                    "description": "Compute average weight change per day/week/month over a date range for the current user.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_from": {"type": "string"},
-                            "date_to": {"type": ["string", "null"]},
-                        },
-                        "required": ["date_from"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_streaks",
-                    "description": "Compute current and longest streaks of consecutive weight-entry days, with start/end dates.",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
-                },
-            },
-        ]
+    def tools(self) -> Sequence[Dict[str, Any]]:
+        return _ANALYTICS_AGENT_TOOLS
 
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        if tool_name == "user_streaks":
-            # Fetch all weight dates for the user
-            rows = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id).all()
-            if not rows:
-                return {"error": "No weights found"}
-            # Unique dates as date objects
-            dates = sorted({r.date_of_measurement for r in rows if getattr(r, 'date_of_measurement', None) is not None})
-            if not dates:
-                return {"error": "No valid dates found"}
-            # Longest streak over entire history
-            longest_len = 1
-            longest_end = dates[0]
-            cur_len = 1
-            cur_start = dates[0]
-            prev = dates[0]
-            for d in dates[1:]:
-                if (d - prev).days == 1:
-                    cur_len += 1
-                else:
-                    if cur_len > longest_len:
-                        longest_len = cur_len
-                        longest_end = prev
-                    cur_len = 1
-                    cur_start = d
-                prev = d
-            # Finalize longest with tail segment
-            if cur_len > longest_len:
-                longest_len = cur_len
-                longest_end = prev
-            longest_start = longest_end - timedelta(days=longest_len - 1)
-
-            # Current streak ending at last recorded day
-            last_day = dates[-1]
-            current_len = 1
-            cursor = last_day - timedelta(days=1)
-            while cursor in dates:
-                current_len += 1
-                cursor = cursor - timedelta(days=1)
-            current_end = last_day
-            current_start = current_end - timedelta(days=current_len - 1)
+        return self._memoized(tool_name, args)
 
+    def _do_user_streaks(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Fetch all weight dates for the user
+        rows = self.db.scalars(self._weights_base.with_only_columns(models.Weight.date_of_measurement)).all()
+        if not rows:
+            return {"error": "No weights found"}
+        # Unique dates as date objects
+        dates = sorted({d for d in rows if d is not None})
+        if not dates:
+            return {"error": "No valid dates found"}
+        # Longest streak over entire history
+        longest_len = 1
+        longest_end = dates[0]
+        cur_len = 1
+        cur_start = dates[0]
+        prev = dates[0]
+        for d in dates[1:]:
+            if (d - prev).days == 1:
+                cur_len += 1
+            else:
+                if cur_len > longest_len:
+                    longest_len = cur_len
+                    longest_end = prev
+                cur_len = 1
+                cur_start = d
+            prev = d
+        # Finalize longest with tail segment
+        if cur_len > longest_len:
+            longest_len = cur_len
+            longest_end = prev
+        longest_start = longest_end - timedelta(days=longest_len - 1)
+
+        # Current streak ending at last recorded day
+        last_day = dates[-1]
+        current_len = 1
+        cursor = last_day - timedelta(days=1)
+        while cursor in dates:
+            current_len += 1
+            cursor = cursor - timedelta(days=1)
+        current_end = last_day
+        current_start = current_end - timedelta(days=current_len - 1)
+
+        return {
+            "current_streak": int(current_len),
+            "current_start": current_start.isoformat(),
+            "current_end": current_end.isoformat(),
+            "longest_streak": int(longest_len),
+            "longest_start": longest_start.isoformat(),
+            "longest_end": longest_end.isoformat(),
+        }
+
+    def _do_user_avg_weight_change(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _parse = parse_date_str
+        d_from = _parse(d) if (d := args.get("date_from")) else None
+        d_to = _parse(d) if (d := args.get("date_to")) else None
+        if not d_from:
+            return {"error": "Invalid date_from"}
+        # One round-trip: latest record (<= date_to, if given) and first record on/after
+        # date_from, each an ORDER BY ... LIMIT 1 over ix_weights_user_date
+        end_stmt = (
+            self._weights_base.with_only_columns(
+                literal("end").label("edge"), models.Weight.date_of_measurement, models.Weight.weight
+            )
+            .order_by(models.Weight.date_of_measurement.desc())
+            .limit(1)
+        )
+        if d_to:
+            end_stmt = end_stmt.where(models.Weight.date_of_measurement <= d_to)
+        start_stmt = (
+            self._weights_base.with_only_columns(
+                literal("start").label("edge"), models.Weight.date_of_measurement, models.Weight.weight
+            )
+            .where(models.Weight.date_of_measurement >= d_from)
+            .order_by(models.Weight.date_of_measurement.asc())
+            .limit(1)
+        )
+        edges = {edge: (dom, w) for edge, dom, w in self.db.execute(union_all(end_stmt, start_stmt))}
+        if "end" not in edges:
+            return {"error": "No weights found in range"}
+        end_date, end_w = edges["end"]
+        end_w = safe_float(end_w)
+        if "start" not in edges:
+            return {"error": "No starting weight found on/after date_from"}
+        start_date, start_w = edges["start"]
+        start_w = safe_float(start_w)
+        days = (end_date - start_date).days or 0
+        if days <= 0 or start_w is None or end_w is None:
             return {
-                "current_streak": int(current_len),
-                "current_start": current_start.isoformat(),
-                "current_end": current_end.isoformat(),
-                "longest_streak": int(longest_len),
-                "longest_start": longest_start.isoformat(),
-                "longest_end": longest_end.isoformat(),
-            }
-        if tool_name == "user_avg_weight_change":
-            d_from = parse_date_str(args.get("date_from")) if args.get("date_from") else None
-            d_to = parse_date_str(args.get("date_to")) if args.get("date_to") else None
-            if not d_from:
-                return {"error": "Invalid date_from"}
-            # end = latest record if date_to not provided
-            q = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id)
-            if d_to:
-                q = q.filter(models.Weight.date_of_measurement <= d_to)
-            latest = q.order_by(models.Weight.date_of_measurement.desc()).first()
-            if not latest:
-                return {"error": "No weights found in range"}
-            end_date = latest.date_of_measurement
-            end_w = safe_float(latest.weight)
-            # find first at or after d_from; if none, first after
-            start_q = self.db.query(models.Weight).filter(
-                models.Weight.user_id == self.user.id,
-                models.Weight.date_of_measurement >= d_from
-            ).order_by(models.Weight.date_of_measurement.asc())
-            start_row = start_q.first()
-            if not start_row:
-                # choose the earliest available after the date_from window (already handled by query)
-                return {"error": "No starting weight found on/after date_from"}
-            start_date = start_row.date_of_measurement
-            start_w = safe_float(start_row.weight)
-            days = (end_date - start_date).days or 0
-            if days <= 0 or start_w is None or end_w is None:
-                return {
-                    "start_date": start_date.isoformat() if start_date else None,
-                    "end_date": end_date.isoformat() if end_date else None,
-                    "delta_kg": None,
-                    "days": days,
-                    "per_day": None,
-                    "per_week": None,
-                    "per_month": None,
-                }
-            delta = round(end_w - start_w, 3)
-            per_day = round(delta / days, 4)
-            per_week = round(per_day * 7, 4)
-            per_month = round(per_day * 30.4375, 4)
-            return {
-                "start_date": start_date.isoformat(),
-                "start_weight_kg": start_w,
-                "end_date": end_date.isoformat(),
-                "end_weight_kg": end_w,
-                "delta_kg": delta,
+                "start_date": start_date.isoformat() if start_date else None,
+                "end_date": end_date.isoformat() if end_date else None,
+                "delta_kg": None,
                 "days": days,
-                "per_day": per_day,
-                "per_week": per_week,
-                "per_month": per_month,
+                "per_day": None,
+                "per_week": None,
+                "per_month": None,
             }
-        if tool_name != "user_weight_change_periods":
-            return None
+        delta = round(end_w - start_w, 3)
+        per_day = round(delta / days, 4)
+        per_week = round(per_day * _DAYS_PER_WEEK, 4)
+        per_month = round(per_day * _DAYS_PER_MONTH, 4)
+        return {
+            "start_date": start_date.isoformat(),
+            "start_weight_kg": start_w,
+            "end_date": end_date.isoformat(),
+            "end_weight_kg": end_w,
+            "delta_kg": delta,
+            "days": days,
+            "per_day": per_day,
+            "per_week": per_week,
+            "per_month": per_month,
+        }
+
+    def _do_user_weight_change_periods(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         periods = args.get("periods_days") or []
         if not isinstance(periods, list) or not periods:
             return {"error": "periods_days must be a non-empty array"}
-        latest = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id).order_by(models.Weight.date_of_measurement.desc()).first()
+        latest = self.db.execute(
+            self._weights_base.with_only_columns(models.Weight.date_of_measurement, models.Weight.weight)
+            .order_by(models.Weight.date_of_measurement.desc())
+            .limit(1)
+        ).first()
         if not latest:
             return {"error": "No weights found"}
         today = latest.date_of_measurement or date.today()
         latest_w = safe_float(latest.weight)
         height_cm = safe_float(self.user.height)
-        now_bmi = calc_bmi(latest_w, height_cm)
-        now_age = age_on(self.user.date_of_birth, today)
-        now_bf = estimate_body_fat_percent(now_bmi, now_age, self.user.sex)
-        now_lbm = estimate_lean_body_mass(latest_w, height_cm, self.user.sex)
+        dob, sex = self.user.date_of_birth, self.user.sex
+
+        # Periods frequently resolve to the same start row (e.g. every span longer
+        # than the history), so derive body metrics once per (weight, date).
+        @lru_cache(maxsize=None)
+        def _derive(weight_kg: Optional[float], on: date) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+            bmi = calc_bmi(weight_kg, height_cm)
+            bf = estimate_body_fat_percent(bmi, age_on(dob, on), sex)
+            return bmi, bf, estimate_lean_body_mass(weight_kg, height_cm, sex)
+
+        now_bmi, now_bf, now_lbm = _derive(latest_w, today)
 
         out = {"latest": {
             "date": today.isoformat(),
@@ -356,21 +519,50 @@ class AnalyticsAgent(BaseAgent):
             "lean_mass_kg": now_lbm,
         }, "periods": []}
 
+        wanted = []
         for d in periods:
             try:
                 d_int = int(d)
             except Exception:
                 continue
-            target_date = today - timedelta(days=d_int)
-            prev = self.db.query(models.Weight).filter(
-                models.Weight.user_id == self.user.id,
-                models.Weight.date_of_measurement <= target_date
-            ).order_by(models.Weight.date_of_measurement.desc()).first()
-            if not prev:
-                prev = self.db.query(models.Weight).filter(
-                    models.Weight.user_id == self.user.id,
-                    models.Weight.date_of_measurement > target_date
-                ).order_by(models.Weight.date_of_measurement).first()
+            wanted.append((len(wanted), d_int, today - timedelta(days=d_int)))
+
+        # Resolve every period's start row in one statement: for each target date, the
+        # latest entry on/before it, falling back to the earliest entry after it.
+        starts: Dict[int, Any] = {}
+        if wanted:
+            targets = values(
+                column("idx", Integer), column("target_date", Date), name="targets"
+            ).data([(i, td) for i, _, td in wanted])
+            before = (
+                self._weights_base.with_only_columns(models.Weight.date_of_measurement, models.Weight.weight)
+                .where(models.Weight.date_of_measurement <= targets.c.target_date)
+                .order_by(models.Weight.date_of_measurement.desc())
+                .limit(1)
+                .lateral("before")
+            )
+            after = (
+                self._weights_base.with_only_columns(models.Weight.date_of_measurement, models.Weight.weight)
+                .where(models.Weight.date_of_measurement > targets.c.target_date)
+                .order_by(models.Weight.date_of_measurement.asc())
+                .limit(1)
+                .lateral("after")
+            )
+            stmt = select(
+                targets.c.idx,
+                before.c.date_of_measurement, before.c.weight,
+                after.c.date_of_measurement, after.c.weight,
+            ).select_from(
+                targets.outerjoin(before, true()).outerjoin(after, true())
+            )
+            for idx, b_date, b_w, a_date, a_w in self.db.execute(stmt):
+                if b_date is not None:
+                    starts[idx] = (b_date, b_w)
+                elif a_date is not None:
+                    starts[idx] = (a_date, a_w)
+
+        for idx, d_int, _ in wanted:
+            prev = starts.get(idx)
             if not prev:
                 out["periods"].append({
                     "days": d_int, "start_date": None, "start_weight_kg": None,
@@ -380,12 +572,9 @@ class AnalyticsAgent(BaseAgent):
                     "lean_mass_start": None, "lean_mass_end": now_lbm,
                 })
                 continue
-            start_w = safe_float(prev.weight)
-            start_date = prev.date_of_measurement
-            start_bmi = calc_bmi(start_w, height_cm)
-            start_age = age_on(self.user.date_of_birth, start_date)
-            start_bf = estimate_body_fat_percent(start_bmi, start_age, self.user.sex)
-            start_lbm = estimate_lean_body_mass(start_w, height_cm, self.user.sex)
+            start_date, start_w = prev
+            start_w = safe_float(start_w)
+            start_bmi, start_bf, start_lbm = _derive(start_w, start_date)
             delta = None
             if start_w is not None and latest_w is not None:
                 delta = round(latest_w - start_w, 2)
@@ -405,673 +594,903 @@ class AnalyticsAgent(BaseAgent):
             })
         return out
 
-class ActionAgent(BaseAgent):
-    name = "action"
+    _DISPATCH = {
+        "user_streaks": _do_user_streaks,
+        "user_avg_weight_change": _do_user_avg_weight_change,
+        "user_weight_change_periods": _do_user_weight_change_periods,
+    }
 
-    def __init__(self, db: Session, user: models.User):
-        self.db = db
-        self.user = user
 
-    def tools(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_create_weight",
-                    "description": "Create weight entry (no future dates).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_of_measurement": {"type": "string"},
-                            "weight": {"type": "number"},
-                            "body_fat_percentage": {"type": ["number", "null"]},
-                            "muscle_mass": {"type": ["number", "null"]},
-                            "notes": {"type": ["string", "null"]},
-                        },
-                        "required": ["date_of_measurement", "weight"],
-                    },
+_ACTION_AGENT_TOOLS: Tuple[Dict[str, Any], ...] = (
+    {
+        "type": "function",
+        "function": {
+            "name": "user_create_weight",
+            "description": "Create weight entry (no future dates).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_of_measurement": {"type": "string"},
+                    "weight": {"type": "number"},
+                    "body_fat_percentage": {"type": ["number", "null"]},
+                    "muscle_mass": {"type": ["number", "null"]},
+                    "notes": {"type": ["string", "null"]},
                 },
+                "required": ["date_of_measurement", "weight"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_update_latest_weight",
-                    "description": "Update most recent weight value.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"weight": {"type": "number"}},
-                        "required": ["weight"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_update_latest_weight",
+            "description": "Update most recent weight value.",
+            "parameters": {
+                "type": "object",
+                "properties": {"weight": {"type": "number"}},
+                "required": ["weight"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_update_weight_by_date",
-                    "description": "Update weight for a specific date (no future dates).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_of_measurement": {"type": "string"},
-                            "weight": {"type": "number"},
-                        },
-                        "required": ["date_of_measurement", "weight"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_update_weight_by_date",
+            "description": "Update weight for a specific date (no future dates).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_of_measurement": {"type": "string"},
+                    "weight": {"type": "number"},
                 },
+                "required": ["date_of_measurement", "weight"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_update_weight",
-                    "description": "Update a weight entry by id.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "weight_id": {"type": "integer"},
-                            "date_of_measurement": {"type": ["string", "null"]},
-                            "weight": {"type": ["number", "null"]},
-                            "body_fat_percentage": {"type": ["number", "null"]},
-                            "muscle_mass": {"type": ["number", "null"]},
-                            "notes": {"type": ["string", "null"]},
-                        },
-                        "required": ["weight_id"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_update_weight",
+            "description": "Update a weight entry by id.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "weight_id": {"type": "integer"},
+                    "date_of_measurement": {"type": ["string", "null"]},
+                    "weight": {"type": ["number", "null"]},
+                    "body_fat_percentage": {"type": ["number", "null"]},
+                    "muscle_mass": {"type": ["number", "null"]},
+                    "notes": {"type": ["string", "null"]},
                 },
+                "required": ["weight_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_delete_weight",
-                    "description": "Delete a weight entry by id.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"weight_id": {"type": "integer"}},
-                        "required": ["weight_id"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_delete_weight",
+            "description": "Delete a weight entry by id.",
+            "parameters": {
+                "type": "object",
+                "properties": {"weight_id": {"type": "integer"}},
+                "required": ["weight_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_create_target",
-                    "description": "Create a target (no past date).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_of_target": {"type": "string"},
-                            "target_weight": {"type": "number"},
-                        },
-                        "required": ["date_of_target", "target_weight"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_create_target",
+            "description": "Create a target (no past date).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_of_target": {"type": "string"},
+                    "target_weight": {"type": "number"},
                 },
+                "required": ["date_of_target", "target_weight"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_update_active_target",
-                    "description": "Update single active target (no past date).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date_of_target": {"type": ["string", "null"]},
-                            "target_weight": {"type": ["number", "null"]},
-                            "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
-                        },
-                        "required": [],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_update_active_target",
+            "description": "Update single active target (no past date).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_of_target": {"type": ["string", "null"]},
+                    "target_weight": {"type": ["number", "null"]},
+                    "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
                 },
+                "required": [],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_update_target",
-                    "description": "Update a target by id (no past date for active).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "target_id": {"type": "integer"},
-                            "date_of_target": {"type": ["string", "null"]},
-                            "target_weight": {"type": ["number", "null"]},
-                            "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
-                        },
-                        "required": ["target_id"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_update_target",
+            "description": "Update a target by id (no past date for active).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "target_id": {"type": "integer"},
+                    "date_of_target": {"type": ["string", "null"]},
+                    "target_weight": {"type": ["number", "null"]},
+                    "status": {"type": ["string", "null"], "enum": ["active", "completed", "cancelled"]},
                 },
+                "required": ["target_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "user_delete_target",
-                    "description": "Delete a target by id.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"target_id": {"type": "integer"}},
-                        "required": ["target_id"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_delete_target",
+            "description": "Delete a target by id.",
+            "parameters": {
+                "type": "object",
+                "properties": {"target_id": {"type": "integer"}},
+                "required": ["target_id"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "user_delete_targets",
+            "description": "Delete several targets by id in one call. Prefer this over repeated user_delete_target calls.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "target_ids": {"type": "array", "items": {"type": "integer"}, "minItems": 1},
                 },
+                "required": ["target_ids"],
             },
-        ]
+        },
+    },
+)
+
+
+class ActionAgent(BaseAgent):
+    name = "action"
+
+    def __init__(self, db: Session, user: models.User):
+        self.db = db
+        self.user = user
+
+    def tools(self) -> Sequence[Dict[str, Any]]:
+        return _ACTION_AGENT_TOOLS
 
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        from datetime import date as _date
-        # Weights
-        if tool_name == "user_create_weight":
-            dom = args.get("date_of_measurement")
-            w = args.get("weight")
-            dom_d = parse_date_str(dom)
-            if not dom_d or w is None:
-                return {"error": "Missing/invalid date_of_measurement or weight"}
-            if dom_d > _date.today():
-                return {"error": "Cannot set a weight entry in the future"}
-            existing = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id, models.Weight.date_of_measurement == dom_d).first()
-            if existing:
-                return {"error": f"Weight entry already exists for {dom}"}
-
-            # Get provided values or None
-            body_fat = args.get("body_fat_percentage")
-            muscle = args.get("muscle_mass")
-
-            # Auto-estimate missing values if user profile allows
-            if body_fat is None or muscle is None:
-                height_cm = safe_float(self.user.height)
-                age_years = age_on(self.user.date_of_birth, dom_d)
-                bmi = calc_bmi(w, height_cm)
-
-                if body_fat is None and bmi and age_years:
-                    body_fat = estimate_body_fat_percent(bmi, age_years, self.user.sex)
-
-                if muscle is None and height_cm:
-                    muscle = estimate_lean_body_mass(w, height_cm, self.user.sex)
-
-            obj = models.Weight(
-                user_id=self.user.id,
-                date_of_measurement=dom_d,
-                weight=w,
-                body_fat_percentage=body_fat,
-                muscle_mass=muscle,
-                notes=args.get("notes"),
-            )
-            self.db.add(obj)
-            self.db.commit()
-            self.db.refresh(obj)
-            return {
-                "id": obj.id,
-                "date": obj.date_of_measurement.isoformat(),
-                "weight": safe_float(obj.weight),
-                "body_fat_percentage": safe_float(obj.body_fat_percentage),
-                "muscle_mass": safe_float(obj.muscle_mass)
-            }
+        result = self._execute(tool_name, args)
+        if result is not None:
+            # Any handled action may have written; read results are no longer safe to reuse
+            invalidate_read_cache(self.db)
+            invalidate_user_context(self.user.id)
+        return result
+
+    def _do_user_create_weight(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        dom = args.get("date_of_measurement")
+        w = args.get("weight")
+        dom_d = parse_date_str(dom)
+        if not dom_d or w is None:
+            return {"error": "Missing/invalid date_of_measurement or weight"}
+        if dom_d > date.today():
+            return {"error": "Cannot set a weight entry in the future"}
+        # Get provided values or None
+        body_fat = args.get("body_fat_percentage")
+        muscle = args.get("muscle_mass")
+
+        # Auto-estimate missing values if user profile allows
+        if body_fat is None or muscle is None:
+            height_cm = safe_float(self.user.height)
+            age_years = age_on(self.user.date_of_birth, dom_d)
+            bmi = calc_bmi(w, height_cm)
+
+            if body_fat is None and bmi and age_years:
+                body_fat = estimate_body_fat_percent(bmi, age_years, self.user.sex)
+
+            if muscle is None and height_cm:
+                muscle = estimate_lean_body_mass(w, height_cm, self.user.sex)
+
+        # The duplicate check is part of the INSERT (INSERT ... SELECT ... WHERE NOT EXISTS), so it
+        # holds whether or not uq_weights_user_date exists yet; the index only backstops races
+        W = models.Weight
+        taken = exists().where(W.user_id == self.user.id, W.date_of_measurement == dom_d)
+        source = select(
+            literal(self.user.id, Integer),
+            literal(dom_d, Date),
+            literal(w, Numeric),
+            literal(body_fat, Numeric),
+            literal(muscle, Numeric),
+            literal(args.get("notes"), String),
+        ).where(~taken)
+        try:
+            row = self.db.execute(
+                insert(W)
+                .from_select(
+                    [W.user_id, W.date_of_measurement, W.weight, W.body_fat_percentage, W.muscle_mass, W.notes],
+                    source,
+                )
+                .returning(W.id, W.date_of_measurement, W.weight, W.body_fat_percentage, W.muscle_mass)
+            ).first()
+        except IntegrityError:
+            self.db.rollback()
+            row = None
+        if not row:
+            return {"error": f"Weight entry already exists for {dom}"}
+        self.db.commit()
+        return {
+            "id": row.id,
+            "date": row.date_of_measurement.isoformat(),
+            "weight": safe_float(row.weight),
+            "body_fat_percentage": safe_float(row.body_fat_percentage),
+            "muscle_mass": safe_float(row.muscle_mass)
+        }
+
+    def _do_user_update_latest_weight(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        new_w = args.get("weight")
+        if new_w is None:
+            return {"error": "Missing weight"}
+        latest_id = (
+            self._weights_base.with_only_columns(models.Weight.id)
+            .order_by(models.Weight.date_of_measurement.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        row = self.db.execute(
+            update(models.Weight)
+            .where(models.Weight.id == latest_id)
+            .values(weight=new_w)
+            .returning(models.Weight.id, models.Weight.date_of_measurement, models.Weight.weight)
+        ).one_or_none()
+        if not row:
+            return {"error": "No weight entries found"}
+        self.db.commit()
+        return {"id": row.id, "date": row.date_of_measurement.isoformat(), "weight": safe_float(row.weight)}
 
-        if tool_name == "user_update_latest_weight":
-            from sqlalchemy import desc as _desc
-            new_w = args.get("weight")
-            if new_w is None:
-                return {"error": "Missing weight"}
-            obj = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id).order_by(_desc(models.Weight.date_of_measurement)).first()
-            if not obj:
-                return {"error": "No weight entries found"}
-            obj.weight = new_w
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date": obj.date_of_measurement.isoformat(), "weight": safe_float(obj.weight)}
-
-        if tool_name == "user_update_weight_by_date":
-            dom = args.get("date_of_measurement")
-            new_w = args.get("weight")
-            dom_d = parse_date_str(dom)
-            if not dom_d or new_w is None:
-                return {"error": "Missing/invalid date_of_measurement or weight"}
-            if dom_d > _date.today():
+    def _do_user_update_weight_by_date(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        dom = args.get("date_of_measurement")
+        new_w = args.get("weight")
+        dom_d = parse_date_str(dom)
+        if not dom_d or new_w is None:
+            return {"error": "Missing/invalid date_of_measurement or weight"}
+        if dom_d > date.today():
+            return {"error": "Cannot set a weight entry in the future"}
+        row = self.db.execute(
+            update(models.Weight)
+            .where(models.Weight.user_id == self.user.id, models.Weight.date_of_measurement == dom_d)
+            .values(weight=new_w)
+            .returning(models.Weight.id, models.Weight.date_of_measurement, models.Weight.weight)
+        ).first()
+        if not row:
+            return {"error": f"No weight entry found for {dom}"}
+        self.db.commit()
+        return {"id": row.id, "date": row.date_of_measurement.isoformat(), "weight": safe_float(row.weight)}
+
+    def _do_user_update_weight(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        wid = int(args.get("weight_id"))
+        changes = {k: v for k, v in args.items() if k in _WEIGHT_UPDATABLE and v is not None}
+        dom_d = None
+        if (raw_dom := args.get("date_of_measurement")) is not None:
+            dom_d = parse_date_str(raw_dom)
+            if not dom_d:
+                return {"error": "Invalid date_of_measurement"}
+            if dom_d > date.today():
                 return {"error": "Cannot set a weight entry in the future"}
-            obj = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id, models.Weight.date_of_measurement == dom_d).first()
-            if not obj:
-                return {"error": f"No weight entry found for {dom}"}
-            obj.weight = new_w
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date": obj.date_of_measurement.isoformat(), "weight": safe_float(obj.weight)}
-
-        if tool_name == "user_update_weight":
-            wid = int(args.get("weight_id"))
-            obj = self.db.query(models.Weight).filter(models.Weight.id == wid, models.Weight.user_id == self.user.id).first()
-            if not obj:
-                return {"error": "Weight entry not found"}
-            if args.get("date_of_measurement") is not None:
-                dom_d = parse_date_str(args.get("date_of_measurement"))
-                if not dom_d:
-                    return {"error": "Invalid date_of_measurement"}
-                if dom_d > _date.today():
-                    return {"error": "Cannot set a weight entry in the future"}
-                dup = self.db.query(models.Weight).filter(models.Weight.user_id == self.user.id, models.Weight.date_of_measurement == dom_d, models.Weight.id != wid).first()
-                if dup:
-                    return {"error": f"Weight entry already exists for {dom_d}"}
-                obj.date_of_measurement = dom_d
-            for fld in ["weight", "body_fat_percentage", "muscle_mass", "notes"]:
-                if fld in args and args[fld] is not None:
-                    setattr(obj, fld, args[fld])
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date": obj.date_of_measurement.isoformat(), "weight": safe_float(obj.weight)}
-
-        if tool_name == "user_delete_weight":
-            wid = int(args.get("weight_id"))
-            obj = self.db.query(models.Weight).filter(models.Weight.id == wid, models.Weight.user_id == self.user.id).first()
-            if not obj:
-                return {"error": "Weight entry not found"}
-            self.db.delete(obj)
-            self.db.commit()
-            return {"message": "Weight entry deleted"}
-
-        if tool_name == "user_create_target":
-            dot = args.get("date_of_target")
-            tw = args.get("target_weight")
-            dot_d = parse_date_str(dot)
-            if not dot_d or tw is None:
-                return {"error": "Missing/invalid date_of_target or target_weight"}
-            if dot_d < _date.today():
-                return {"error": "Cannot create a target in the past"}
-            obj = models.TargetWeight(
-                user_id=self.user.id,
-                date_of_target=dot_d,
-                target_weight=tw,
-                status="active",
-            )
-            self.db.add(obj)
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
-
-        if tool_name == "user_update_active_target":
-            active = self.db.query(models.TargetWeight).filter(models.TargetWeight.user_id == self.user.id, models.TargetWeight.status == "active").order_by(models.TargetWeight.created_date.desc()).all()
-            if not active:
-                return {"error": "No active target to update"}
-            if len(active) > 1:
-                return {"error": "Multiple active targets; specify target_id"}
-            obj = active[0]
-            if args.get("date_of_target") is not None:
-                dot_d = parse_date_str(args.get("date_of_target"))
-                if not dot_d:
-                    return {"error": "Invalid date_of_target"}
-                if dot_d < _date.today():
-                    return {"error": "Cannot set an active target's date to the past"}
-                obj.date_of_target = dot_d
-            if args.get("target_weight") is not None:
-                obj.target_weight = args.get("target_weight")
-            if args.get("status") is not None:
-                status_val = str(args.get("status"))
-                if status_val not in ["active", "completed", "cancelled"]:
-                    return {"error": "Status must be one of: active, completed, cancelled"}
-                obj.status = status_val
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
-
-        if tool_name == "user_update_target":
-            tid = int(args.get("target_id"))
-            obj = self.db.query(models.TargetWeight).filter(models.TargetWeight.id == tid, models.TargetWeight.user_id == self.user.id).first()
-            if not obj:
-                return {"error": "Target not found"}
-            if args.get("date_of_target") is not None:
-                dot_d = parse_date_str(args.get("date_of_target"))
-                if not dot_d:
-                    return {"error": "Invalid date_of_target"}
-                if (obj.status or "active") == "active" and dot_d < _date.today():
-                    return {"error": "Cannot set an active target's date to the past"}
-                obj.date_of_target = dot_d
-            if args.get("target_weight") is not None:
-                obj.target_weight = args.get("target_weight")
-            if args.get("status") is not None:
-                status_val = str(args.get("status"))
-                if status_val not in ["active", "completed", "cancelled"]:
-                    return {"error": "Status must be one of: active, completed, cancelled"}
-                obj.status = status_val
-            self.db.commit()
-            self.db.refresh(obj)
-            return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
-
-        if tool_name == "user_delete_target":
-            tid = int(args.get("target_id"))
-            obj = self.db.query(models.TargetWeight).filter(models.TargetWeight.id == tid, models.TargetWeight.user_id == self.user.id).first()
-            if not obj:
-                return {"error": "Target not found"}
-            self.db.delete(obj)
-            self.db.commit()
-            return {"message": "Target deleted"}
+            changes["date_of_measurement"] = dom_d
+        cols = (models.Weight.id, models.Weight.date_of_measurement, models.Weight.weight)
+        owned = (models.Weight.id == wid, models.Weight.user_id == self.user.id)
+        date_taken = {"error": f"Weight entry already exists for {dom_d}"}
+        if not changes:
+            row = self.db.execute(select(*cols).where(*owned)).first()
+        else:
+            stmt = update(models.Weight).where(*owned)
+            if dom_d is not None:
+                # Checked in the UPDATE itself; uq_weights_user_date (when present) backstops races
+                other = aliased(models.Weight)
+                stmt = stmt.where(~exists().where(
+                    other.user_id == self.user.id, other.date_of_measurement == dom_d, other.id != wid
+                ))
+            try:
+                row = self.db.execute(stmt.values(**changes).returning(*cols)).first()
+            except IntegrityError:
+                self.db.rollback()
+                if dom_d is None:
+                    raise
+                return date_taken
+            if not row and dom_d is not None and self.db.execute(select(models.Weight.id).where(*owned)).first():
+                return date_taken
+        if not row:
+            return {"error": "Weight entry not found"}
+        self.db.commit()
+        return {"id": row.id, "date": row.date_of_measurement.isoformat(), "weight": safe_float(row.weight)}
 
-        return None
+    def _do_user_delete_weight(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        wid = int(args.get("weight_id"))
+        obj = self.db.get(models.Weight, wid)
+        if not obj or obj.user_id != self.user.id:
+            return {"error": "Weight entry not found"}
+        self.db.delete(obj)
+        self.db.commit()
+        return {"message": "Weight entry deleted"}
 
-class AdminAgent(BaseAgent):
-    name = "admin"
+    def _do_user_create_target(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        dot = args.get("date_of_target")
+        tw = args.get("target_weight")
+        dot_d = parse_date_str(dot)
+        if not dot_d or tw is None:
+            return {"error": "Missing/invalid date_of_target or target_weight"}
+        if dot_d < date.today():
+            return {"error": "Cannot create a target in the past"}
+        obj = models.TargetWeight(
+            user_id=self.user.id,
+            date_of_target=dot_d,
+            target_weight=tw,
+            status="active",
+        )
+        self.db.add(obj)
+        self.db.commit()
+        self.db.refresh(obj)
+        return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
 
-    def __init__(self, db: Session, user: models.User):
-        self.db = db
-        self.user = user
+    def _do_user_update_active_target(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Two ids are enough to tell none / one / many apart
+        active_ids = self.db.scalars(
+            select(models.TargetWeight.id)
+            .where(models.TargetWeight.user_id == self.user.id, models.TargetWeight.status == "active")
+            .order_by(models.TargetWeight.created_date.desc())
+            .limit(2)
+        ).all()
+        if not active_ids:
+            return {"error": "No active target to update"}
+        if len(active_ids) > 1:
+            return {"error": "Multiple active targets; specify target_id"}
+        obj = self.db.get(models.TargetWeight, active_ids[0])
+        if (raw_dot := args.get("date_of_target")) is not None:
+            dot_d = parse_date_str(raw_dot)
+            if not dot_d:
+                return {"error": "Invalid date_of_target"}
+            if dot_d < date.today():
+                return {"error": "Cannot set an active target's date to the past"}
+            obj.date_of_target = dot_d
+        if (tw := args.get("target_weight")) is not None:
+            obj.target_weight = tw
+        if (raw_status := args.get("status")) is not None:
+            status_val = str(raw_status)
+            if status_val not in ["active", "completed", "cancelled"]:
+                return {"error": "Status must be one of: active, completed, cancelled"}
+            obj.status = status_val
+        self.db.commit()
+        self.db.refresh(obj)
+        return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
 
-    def tools(self) -> List[Dict[str, Any]]:
-        if not self.user.is_admin:
-            return []
-        return [
-            # Read-only admin/meta tools
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_users_count",
-                    "description": "Count rows in users table (admin)",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
+    def _do_user_update_target(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tid = int(args.get("target_id"))
+        obj = self.db.get(models.TargetWeight, tid)
+        if not obj or obj.user_id != self.user.id:
+            return {"error": "Target not found"}
+        if (raw_dot := args.get("date_of_target")) is not None:
+            dot_d = parse_date_str(raw_dot)
+            if not dot_d:
+                return {"error": "Invalid date_of_target"}
+            if (obj.status or "active") == "active" and dot_d < date.today():
+                return {"error": "Cannot set an active target's date to the past"}
+            obj.date_of_target = dot_d
+        if (tw := args.get("target_weight")) is not None:
+            obj.target_weight = tw
+        if (raw_status := args.get("status")) is not None:
+            status_val = str(raw_status)
+            if status_val not in ["active", "completed", "cancelled"]:
+                return {"error": "Status must be one of: active, completed, cancelled"}
+            obj.status = status_val
+        self.db.commit()
+        self.db.refresh(obj)
+        return {"id": obj.id, "date_of_target": obj.date_of_target.isoformat(), "target_weight": safe_float(obj.target_weight), "status": obj.status}
+
+    def _do_user_delete_target(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tid = int(args.get("target_id"))
+        obj = self.db.get(models.TargetWeight, tid)
+        if not obj or obj.user_id != self.user.id:
+            return {"error": "Target not found"}
+        self.db.delete(obj)
+        self.db.commit()
+        return {"message": "Target deleted"}
+
+    def _do_user_delete_targets(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        raw_ids = args.get("target_ids")
+        if not isinstance(raw_ids, list) or not raw_ids:
+            return {"error": "target_ids must be a non-empty array"}
+        try:
+            ids = sorted({int(t) for t in raw_ids})
+        except (TypeError, ValueError):
+            return {"error": "target_ids must be integers"}
+        # One DELETE ... WHERE id IN (...) scoped to the user's own targets
+        deleted = set(self.db.scalars(
+            delete(models.TargetWeight)
+            .where(models.TargetWeight.user_id == self.user.id, models.TargetWeight.id.in_(ids))
+            .returning(models.TargetWeight.id)
+        ).all())
+        self.db.commit()
+        return {
+            "deleted": sorted(deleted),
+            "not_found": [t for t in ids if t not in deleted],
+        }
+
+    _DISPATCH = {
+        "user_create_weight": _do_user_create_weight,
+        "user_update_latest_weight": _do_user_update_latest_weight,
+        "user_update_weight_by_date": _do_user_update_weight_by_date,
+        "user_update_weight": _do_user_update_weight,
+        "user_delete_weight": _do_user_delete_weight,
+        "user_create_target": _do_user_create_target,
+        "user_update_active_target": _do_user_update_active_target,
+        "user_update_target": _do_user_update_target,
+        "user_delete_target": _do_user_delete_target,
+        "user_delete_targets": _do_user_delete_targets,
+    }
+
+
+_ADMIN_AGENT_TOOLS: Tuple[Dict[str, Any], ...] = (
+    # Read-only admin/meta tools
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_users_count",
+            "description": "Count rows in users table (admin)",
+            "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_list_users",
+            "description": "List users with safe fields only (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
+                    "offset": {"type": ["integer", "null"], "minimum": 0},
                 },
+                "required": [],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_list_users",
-                    "description": "List users with safe fields only (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "limit": {"type": ["integer", "null"], "minimum": 1, "maximum": 1000},
-                            "offset": {"type": ["integer", "null"], "minimum": 0},
-                        },
-                        "required": [],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_list_tables",
+            "description": "List all tables in the database (admin)",
+            "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_table_schema",
+            "description": "Get table schema (columns/types) (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {"table": {"type": "string"}},
+                "required": ["table"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_list_tables",
-                    "description": "List all tables in the database (admin)",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_create_user",
+            "description": "Create a new user (admin). Requires name and password; email is optional.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "password": {"type": "string"},
+                    "email": {"type": ["string", "null"]},
+                    "sex": {"type": ["string", "null"]},
+                    "height": {"type": ["number", "null"]},
+                    "activity_level": {"type": ["string", "null"]},
+                    "date_of_birth": {"type": ["string", "null"]},
+                    "is_admin": {"type": ["boolean", "null"]},
                 },
+                "required": ["name", "password"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_table_schema",
-                    "description": "Get table schema (columns/types) (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"table": {"type": "string"}},
-                        "required": ["table"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_get_user_by_name",
+            "description": "Lookup a user by exact name. Returns id and safe fields (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}},
+                "required": ["name"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_create_user",
-                    "description": "Create a new user (admin). Requires name and password; email is optional.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string"},
-                            "password": {"type": "string"},
-                            "email": {"type": ["string", "null"]},
-                            "sex": {"type": ["string", "null"]},
-                            "height": {"type": ["number", "null"]},
-                            "activity_level": {"type": ["string", "null"]},
-                            "date_of_birth": {"type": ["string", "null"]},
-                            "is_admin": {"type": ["boolean", "null"]},
-                        },
-                        "required": ["name", "password"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_update_user",
+            "description": "Update user profile (admin). Supports name, email, sex, height, activity_level, date_of_birth, and is_admin.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "integer"},
+                    "name": {"type": ["string", "null"]},
+                    "email": {"type": ["string", "null"]},
+                    "sex": {"type": ["string", "null"]},
+                    "height": {"type": ["number", "null"]},
+                    "activity_level": {"type": ["string", "null"]},
+                    "date_of_birth": {"type": ["string", "null"]},
+                    "is_admin": {"type": ["boolean", "null"]},
                 },
+                "required": ["user_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_get_user_by_name",
-                    "description": "Lookup a user by exact name. Returns id and safe fields (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"name": {"type": "string"}},
-                        "required": ["name"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_update_user",
-                    "description": "Update user profile (admin). Supports name, email, sex, height, activity_level, date_of_birth, and is_admin.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "integer"},
-                            "name": {"type": ["string", "null"]},
-                            "email": {"type": ["string", "null"]},
-                            "sex": {"type": ["string", "null"]},
-                            "height": {"type": ["number", "null"]},
-                            "activity_level": {"type": ["string", "null"]},
-                            "date_of_birth": {"type": ["string", "null"]},
-                            "is_admin": {"type": ["boolean", "null"]},
-                        },
-                        "required": ["user_id"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_set_user_password",
-                    "description": "Set user password (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "integer"},
-                            "new_password": {"type": "string"},
-                        },
-                        "required": ["user_id", "new_password"],
-                    },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_set_user_password",
+            "description": "Set user password (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "integer"},
+                    "new_password": {"type": "string"},
                 },
+                "required": ["user_id", "new_password"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_delete_user",
-                    "description": "Delete a user by id (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"user_id": {"type": "integer"}},
-                        "required": ["user_id"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_delete_user",
+            "description": "Delete a user by id (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {"user_id": {"type": "integer"}},
+                "required": ["user_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_delete_user_by_name",
-                    "description": "Delete user by exact name (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"name": {"type": "string"}},
-                        "required": ["name"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_delete_user_by_name",
+            "description": "Delete user by exact name (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}},
+                "required": ["name"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_delete_target",
-                    "description": "Delete target by id (admin)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {"target_id": {"type": "integer"}},
-                        "required": ["target_id"],
-                    },
-                },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_delete_target",
+            "description": "Delete target by id (admin)",
+            "parameters": {
+                "type": "object",
+                "properties": {"target_id": {"type": "integer"}},
+                "required": ["target_id"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "admin_promote_all_non_admins",
-                    "description": "Promote all non-admin users to admin (admin)",
-                    "parameters": {"type": "object", "properties": {}, "required": []},
-                },
-            },
-        ]
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "admin_promote_all_non_admins",
+            "description": "Promote all non-admin users to admin (admin)",
+            "parameters": {"type": "object", "properties": {}, "required": []},
+        },
+    },
+)
+
+
+# ---------------- Schema reflection cache ----------------
+# Catalog lookups for the admin schema tools; the schema only changes on deploy
+# (startup migrations), so a short TTL per engine is plenty.
+_SCHEMA_CACHE_TTL_SECONDS = 60
+_schema_cache: Dict[tuple, Tuple[float, Any]] = {}
+
+
+def _schema_cache_get(key: tuple):
+    rec = _schema_cache.get(key)
+    if not rec:
+        return None
+    ts, data = rec
+    if (time.monotonic() - ts) > _SCHEMA_CACHE_TTL_SECONDS:
+        return None
+    return data
+
+
+def _schema_cache_set(key: tuple, data: Any) -> None:
+    _schema_cache[key] = (time.monotonic(), data)
+
+
+# admin_users_count is polled by dashboards; absorb bursts for a few seconds and
+# drop the value whenever this process creates or deletes a user (agent or REST)
+_USERS_COUNT_TTL_SECONDS = 5.0
+_users_count_cache: Dict[str, Any] = {"value": None, "expires": 0.0}
+_users_count_lock = threading.Lock()
+
+
+def invalidate_users_count() -> None:
+    """Forget the cached admin_users_count total."""
+    with _users_count_lock:
+        _users_count_cache["expires"] = 0.0
+
+
+# Admin tools that write; only these invalidate cached reads
+_ADMIN_MUTATING_TOOLS = frozenset({
+    "admin_create_user",
+    "admin_update_user",
+    "admin_set_user_password",
+    "admin_delete_user",
+    "admin_delete_user_by_name",
+    "admin_delete_target",
+    "admin_promote_all_non_admins",
+})
+
+
+class AdminAgent(BaseAgent):
+    name = "admin"
+
+    def __init__(self, db: Session, user: models.User):
+        self.db = db
+        self.user = user
+
+    def tools(self) -> Sequence[Dict[str, Any]]:
+        if not self.user.is_admin:
+            return ()
+        return _ADMIN_AGENT_TOOLS
 
     def execute(self, tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not self.user.is_admin:
             return None
-        if tool_name == "admin_users_count":
-            from sqlalchemy import func
-            total = self.db.query(func.count(models.User.id)).scalar() or 0
-            return {"total": int(total)}
-        if tool_name == "admin_list_users":
-            lim = min(int(args.get("limit") or 50), 500)
-            off = int(args.get("offset") or 0)
-            rows = self.db.query(models.User).order_by(models.User.id).offset(off).limit(lim).all()
-            data = [
-                {
-                    "id": u.id,
-                    "name": u.name,
-                    "email": u.email,
-                    "is_admin": bool(u.is_admin),
-                    "created_at": u.created_at.isoformat() if u.created_at else None,
-                }
-                for u in rows
-            ]
-            return {"count": len(data), "users": data}
-        if tool_name == "admin_list_tables":
-            from sqlalchemy import inspect
-            insp = inspect(self.db.bind)
+        result = self._execute(tool_name, args)
+        if result is not None and tool_name in _ADMIN_MUTATING_TOOLS:
+            # Admin writes can touch the caller's own rows (e.g. admin_delete_target)
+            invalidate_read_cache(self.db)
+        return result
+
+    def _do_admin_users_count(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with _users_count_lock:
+            total = _users_count_cache["value"]
+            fresh = total is not None and now < _users_count_cache["expires"]
+        if not fresh:
+            total = int(self.db.query(func.count(models.User.id)).scalar() or 0)
+            with _users_count_lock:
+                _users_count_cache.update(value=total, expires=now + _USERS_COUNT_TTL_SECONDS)
+        return {"total": total}
+
+    def _do_admin_list_users(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        lim = min(int(args.get("limit") or 50), 500)
+        off = int(args.get("offset") or 0)
+        rows = (
+            self.db.query(models.User)
+            .with_entities(
+                models.User.id,
+                models.User.name,
+                models.User.email,
+                models.User.is_admin,
+                models.User.created_at,
+            )
+            .order_by(models.User.id)
+            .offset(off)
+            .limit(lim)
+            # Consumed by the comprehension below in server-side cursor batches
+            .execution_options(yield_per=_STREAM_BATCH_ROWS)
+        )
+        data = [
+            {
+                "id": uid,
+                "name": name,
+                "email": email,
+                "is_admin": bool(is_admin),
+                "created_at": created_at.isoformat() if created_at else None,
+            }
+            for uid, name, email, is_admin, created_at in rows
+        ]
+        return {"count": len(data), "users": data}
+
+    def _do_admin_list_tables(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = (id(self.db.bind), "tables")
+        tables = _schema_cache_get(key)
+        if tables is None:
             try:
-                tables = insp.get_table_names()
+                tables = inspect(self.db.bind).get_table_names()
+                _schema_cache_set(key, tables)
             except Exception:
                 tables = []
-            return {"tables": tables}
-        if tool_name == "admin_table_schema":
-            from sqlalchemy import inspect
-            table = (args.get("table") or "").strip()
-            if not table:
-                return {"error": "Missing table"}
-            insp = inspect(self.db.bind)
-            try:
-                cols = insp.get_columns(table)
-                schema = [
-                    {
-                        "name": c.get("name"),
-                        "type": str(c.get("type")),
-                        "nullable": bool(c.get("nullable", True)),
-                        "primary_key": bool(c.get("primary_key", False)),
-                    }
-                    for c in cols
-                ]
-                return {"table": table, "columns": schema}
-            except Exception:
-                return {"error": f"Unknown table: {table}"}
-        if tool_name == "admin_get_user_by_name":
-            name = (args.get("name") or "").strip()
-            if not name:
-                return {"error": "Missing name"}
-            u = self.db.query(models.User).filter(models.User.name == name).first()
-            if not u:
-                return {"error": "User not found"}
-            return {
-                "id": u.id,
-                "name": u.name,
-                "email": u.email,
-                "is_admin": bool(u.is_admin),
-                "created_at": u.created_at.isoformat() if u.created_at else None,
-            }
-        if tool_name == "admin_create_user":
-            from ..auth import get_password_hash  # type: ignore
-            name = args.get("name")
-            password = args.get("password")
-            if not name or not password:
-                return {"error": "Missing name or password"}
-            existing = self.db.query(models.User).filter(models.User.name == name).first()
-            if existing:
-                return {"error": "Username already registered"}
-            email = args.get("email")
-            if email:
-                existing_email = self.db.query(models.User).filter(models.User.email == email).first()
-                if existing_email:
-                    return {"error": "Email already registered"}
-            u = models.User(
-                name=name,
-                email=email,
-                password_hash=get_password_hash(password),
-                sex=args.get("sex"),
-                height=args.get("height"),
-                activity_level=args.get("activity_level"),
-                date_of_birth=args.get("date_of_birth"),
-                is_admin=bool(args.get("is_admin") or False),
+        return {"tables": tables}
+
+    def _do_admin_table_schema(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        table = (args.get("table") or "").strip()
+        if not table:
+            return {"error": "Missing table"}
+        key = (id(self.db.bind), "columns", table)
+        schema = _schema_cache_get(key)
+        if schema is not None:
+            return {"table": table, "columns": schema}
+        insp = inspect(self.db.bind)
+        try:
+            cols = insp.get_columns(table)
+            schema = [
+                {
+                    "name": c.get("name"),
+                    "type": str(c.get("type")),
+                    "nullable": bool(c.get("nullable", True)),
+                    "primary_key": bool(c.get("primary_key", False)),
+                }
+                for c in cols
+            ]
+            _schema_cache_set(key, schema)
+            return {"table": table, "columns": schema}
+        except Exception:
+            return {"error": f"Unknown table: {table}"}
+
+    def _do_admin_get_user_by_name(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        name = (args.get("name") or "").strip()
+        if not name:
+            return {"error": "Missing name"}
+        u = self.db.query(models.User).filter(models.User.name == name).first()
+        if not u:
+            return {"error": "User not found"}
+        return {
+            "id": u.id,
+            "name": u.name,
+            "email": u.email,
+            "is_admin": bool(u.is_admin),
+            "created_at": u.created_at.isoformat() if u.created_at else None,
+        }
+
+    def _do_admin_create_user(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        name = args.get("name")
+        password = args.get("password")
+        if not name or not password:
+            return {"error": "Missing name or password"}
+        # EXISTS probes return a boolean instead of hydrating a User row
+        if self.db.scalar(select(exists().where(models.User.name == name))):
+            return {"error": "Username already registered"}
+        email = args.get("email")
+        if email and self.db.scalar(select(exists().where(models.User.email == email))):
+            return {"error": "Email already registered"}
+        u = models.User(
+            name=name,
+            email=email,
+            password_hash=get_password_hash(password),
+            sex=args.get("sex"),
+            height=args.get("height"),
+            activity_level=args.get("activity_level"),
+            date_of_birth=args.get("date_of_birth"),
+            is_admin=bool(args.get("is_admin") or False),
+        )
+        self.db.add(u)
+        self.db.commit()
+        invalidate_users_count()
+        self.db.refresh(u)
+        return {"id": u.id, "name": u.name, "is_admin": u.is_admin}
+
+    def _do_admin_update_user(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        uid = int(args.get("user_id"))
+        u = self.db.get(models.User, uid)
+        if not u:
+            return {"error": "User not found"}
+        new_name = args.get("name")
+        new_email = args.get("email")
+        # Check name and email collisions in one round trip
+        clashes = []
+        if new_name is not None:
+            clashes.append(models.User.name == new_name)
+        if new_email:
+            clashes.append(models.User.email == new_email)
+        if clashes:
+            taken = (
+                self.db.query(models.User.name, models.User.email)
+                .filter(models.User.id != uid, or_(*clashes))
+                .all()
             )
-            self.db.add(u)
-            self.db.commit()
-            self.db.refresh(u)
-            return {"id": u.id, "name": u.name, "is_admin": u.is_admin}
-        if tool_name == "admin_update_user":
-            uid = int(args.get("user_id"))
-            u = self.db.query(models.User).filter(models.User.id == uid).first()
-            if not u:
-                return {"error": "User not found"}
-            if args.get("name") is not None:
-                exists = self.db.query(models.User).filter(models.User.name == args["name"], models.User.id != uid).first()
-                if exists:
-                    return {"error": "Username already taken"}
-                u.name = args["name"]
-            if args.get("email") is not None:
-                if args.get("email"):
-                    exists_email = self.db.query(models.User).filter(models.User.email == args["email"], models.User.id != uid).first()
-                    if exists_email:
-                        return {"error": "Email already in use"}
-                    u.email = args["email"]
-                else:
-                    u.email = None
-            for fld in ["sex", "height", "activity_level", "date_of_birth"]:
-                if fld in args and args[fld] is not None:
-                    setattr(u, fld, args[fld])
-            if "is_admin" in args and args["is_admin"] is not None:
-                u.is_admin = bool(args["is_admin"])  # promote/demote admin
-            self.db.commit()
-            self.db.refresh(u)
-            return {"id": u.id, "name": u.name, "is_admin": bool(u.is_admin)}
-        if tool_name == "admin_set_user_password":
-            uid = int(args.get("user_id"))
-            new_pw = args.get("new_password") or ""
-            if len(new_pw) < 8:
-                return {"error": "Password must be at least 8 characters"}
-            from ..auth import get_password_hash  # type: ignore
-            u = self.db.query(models.User).filter(models.User.id == uid).first()
-            if not u:
-                return {"error": "User not found"}
-            u.password_hash = get_password_hash(new_pw)
-            self.db.commit()
-            return {"message": "Password updated"}
-        if tool_name == "admin_delete_user":
-            uid = int(args.get("user_id"))
-            u = self.db.query(models.User).filter(models.User.id == uid).first()
-            if not u:
-                return {"error": "User not found"}
-            self.db.delete(u)
-            self.db.commit()
-            return {"message": "User deleted"}
-        if tool_name == "admin_delete_user_by_name":
-            name = (args.get("name") or "").strip()
-            if not name:
-                return {"error": "Missing name"}
-            u = self.db.query(models.User).filter(models.User.name == name).first()
-            if not u:
-                return {"error": "User not found"}
-            self.db.delete(u)
-            self.db.commit()
-            return {"message": "User deleted"}
-        if tool_name == "admin_delete_target":
-            tid = int(args.get("target_id"))
-            t = self.db.query(models.TargetWeight).filter(models.TargetWeight.id == tid).first()
-            if not t:
-                return {"error": "Target not found"}
-            self.db.delete(t)
-            self.db.commit()
-            return {"message": "Target deleted"}
-        if tool_name == "admin_promote_all_non_admins":
-            rows = self.db.query(models.User).filter(models.User.is_admin != True).all()
-            count = 0
-            for u in rows:
-                u.is_admin = True
-                count += 1
-            self.db.commit()
-            return {"updated": count}
-        return None
+            if new_name is not None and any(n == new_name for n, _ in taken):
+                return {"error": "Username already taken"}
+            if new_email and any(e == new_email for _, e in taken):
+                return {"error": "Email already in use"}
+        if new_name is not None:
+            u.name = new_name
+        if new_email is not None:
+            u.email = new_email or None
+        for fld in ("sex", "height", "activity_level", "date_of_birth"):
+            if (v := args.get(fld)) is not None:
+                setattr(u, fld, v)
+        if (is_admin := args.get("is_admin")) is not None:
+            u.is_admin = bool(is_admin)  # promote/demote admin
+        self.db.commit()
+        invalidate_user_context(uid)
+        self.db.refresh(u)
+        return {"id": u.id, "name": u.name, "is_admin": bool(u.is_admin)}
+
+    def _do_admin_set_user_password(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        uid = int(args.get("user_id"))
+        new_pw = args.get("new_password") or ""
+        if len(new_pw) < 8:
+            return {"error": "Password must be at least 8 characters"}
+        u = self.db.get(models.User, uid)
+        if not u:
+            return {"error": "User not found"}
+        u.password_hash = get_password_hash(new_pw)
+        self.db.commit()
+        return {"message": "Password updated"}
+
+    def _do_admin_delete_user(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        uid = int(args.get("user_id"))
+        u = self.db.get(models.User, uid)
+        if not u:
+            return {"error": "User not found"}
+        self.db.delete(u)
+        self.db.commit()
+        invalidate_users_count()
+        invalidate_user_context(uid)
+        return {"message": "User deleted"}
+
+    def _do_admin_delete_user_by_name(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        name = (args.get("name") or "").strip()
+        if not name:
+            return {"error": "Missing name"}
+        u = self.db.query(models.User).filter(models.User.name == name).first()
+        if not u:
+            return {"error": "User not found"}
+        uid = u.id
+        self.db.delete(u)
+        self.db.commit()
+        invalidate_users_count()
+        invalidate_user_context(uid)
+        return {"message": "User deleted"}
+
+    def _do_admin_delete_target(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tid = int(args.get("target_id"))
+        t = self.db.get(models.TargetWeight, tid)
+        if not t:
+            return {"error": "Target not found"}
+        owner_id = t.user_id
+        self.db.delete(t)
+        self.db.commit()
+        invalidate_user_context(owner_id)
+        return {"message": "Target deleted"}
+
+    def _do_admin_promote_all_non_admins(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # One UPDATE instead of loading and flushing every user; the commit expires
+        # any User already in the session, so no in-Python synchronization is needed
+        count = (
+            self.db.query(models.User)
+            .filter(models.User.is_admin != True)  # noqa: E712
+            .update({models.User.is_admin: True}, synchronize_session=False)
+        )
+        self.db.commit()
+        # Touches every non-admin profile
+        invalidate_user_context()
+        return {"updated": int(count)}
+
+    _DISPATCH = {
+        "admin_users_count": _do_admin_users_count,
+        "admin_list_users": _do_admin_list_users,
+        "admin_list_tables": _do_admin_list_tables,
+        "admin_table_schema": _do_admin_table_schema,
+        "admin_get_user_by_name": _do_admin_get_user_by_name,
+        "admin_create_user": _do_admin_create_user,
+        "admin_update_user": _do_admin_update_user,
+        "admin_set_user_password": _do_admin_set_user_password,
+        "admin_delete_user": _do_admin_delete_user,
+        "admin_delete_user_by_name": _do_admin_delete_user_by_name,
+        "admin_delete_target": _do_admin_delete_target,
+        "admin_promote_all_non_admins": _do_admin_promote_all_non_admins,
+    }
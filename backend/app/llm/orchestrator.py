@@ -1,11 +1,20 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, Callable
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Callable, Tuple
 
 from .. import models
-from ..config import settings
+from ..config import get_settings
+from ..database import SessionLocal, pool_headroom
 from sqlalchemy.orm import Session
 
-from .agents import SQLAgent, AnalyticsAgent, ActionAgent, AdminAgent, BaseAgent
+from .agents import SQLAgent, AnalyticsAgent, ActionAgent, AdminAgent, BaseAgent, session_read_cache, share_read_cache
 from .tools import summarize_schema, gather_user_context
 
 try:
@@ -14,61 +23,327 @@ except Exception:
     OpenAI = None  # type: ignore
 
 
+@dataclass(slots=True)
+class _LocalMsg:
+    """Assistant message produced locally (cache hit or fallback) instead of by the API."""
+    content: str
+    tool_calls: Optional[list] = None
+
+
+def _keyword_pattern(*keywords: str) -> "re.Pattern[str]":
+    """Compile keywords into one alternation so a single scan answers 'any keyword in text'."""
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+# Intent gating keyword sets, compiled once at import
+_ADMIN_INTENT_RE = _keyword_pattern(
+    "admin", "user ", "users", "accounts", "account",
+    "schema", "table", "tables", "database", "db",
+    "backup", "migrate", "migration", "org", "organization",
+    "create user", "new user", "set password", "password",
+    "make admin", "admin privileges", "promote", "elevate",
+    "revoke admin", "remove admin", "remove admin privileges", "demote", "unadmin",
+)
+_WEIGHT_INTENT_RE = _keyword_pattern(
+    "weight", "weigh", "bmi", "target", "goal", "trend", "streak", "log", "record", "kg", "lbs",
+)
+# Direct action verbs and synonyms from the user
+_ACTION_VERB_RE = _keyword_pattern(
+    "create", "add", "update", "delete", "set", "cancel", "remove",
+    "grant", "promote", "make admin", "admin privileges", "elevate",
+    "revoke", "demote", "remove admin", "remove admin privileges", "unadmin",
+)
+_CONFIRMATION_RE = _keyword_pattern(
+    "yes", "yep", "sure", "ok", "okay", "go ahead", "please do", "confirm", "do it", "proceed",
+)
+_PROPOSED_ACTION_RE = _keyword_pattern(
+    "cancel", "delete", "update", "create", "set", "grant", "promote", "make admin", "admin privileges", "elevate",
+    "revoke", "demote", "remove admin", "remove admin privileges", "unadmin",
+)
+_PROPOSAL_SUBJECT_RE = _keyword_pattern("target", "weight", "user", "users")
+_PROPOSED_ADMIN_RE = _keyword_pattern(
+    "admin", "make admin", "admin privileges", "revoke", "demote", "remove admin", "unadmin",
+)
+_ADMIN_TOGGLE_RE = _keyword_pattern(
+    "make admin", "grant admin", "promote", "admin privileges", "elevate", "revoke", "demote", "remove admin", "unadmin",
+)
+_REVOKE_RE = _keyword_pattern("revoke", "demote", "remove admin", "unadmin")
+_GRANT_RE = _keyword_pattern("make admin", "promote", "grant admin", "admin privileges", "elevate")
+_FALLBACK_GRANT_RE = _keyword_pattern("make admin", "promote", "grant", "admin privileges")
+# Username extraction for the deterministic admin grant/revoke path
+_USER_NAME_RE = re.compile(r"user\s+([A-Za-z0-9_\-\.]+)")
+_FROM_FOR_NAME_RE = re.compile(r"(?:from|for)\s+([A-Za-z0-9_\-\.]+)")
+_SMALLTALK_RE = _keyword_pattern(
+    "hi", "hello", "hey", "how are you", "good morning", "good evening",
+    "thanks", "thank you", "yo", "sup", "what's up", "bye", "goodbye",
+)
+# Canned answers for bare greetings that need neither data nor the model
+_SMALLTALK_REPLIES = {
+    "hi": "Hi! How can I help with your weights or targets today?",
+    "hello": "Hello! How can I help with your weights or targets today?",
+    "hey": "Hey! How can I help with your weights or targets today?",
+    "thanks": "You're welcome! Anything else I can help with?",
+    "thank you": "You're welcome! Anything else I can help with?",
+    "bye": "Goodbye! Keep up the good work.",
+    "goodbye": "Goodbye! Keep up the good work.",
+}
+
+
+def _intent_text(messages: List[Dict[str, str]]) -> Tuple[str, str]:
+    """Return (recent user text, last assistant text), lowercased, from one reverse scan.
+
+    The last three user messages are combined to preserve ongoing intent
+    (e.g., follow-ups like "password is ...").
+    """
+    recent_user: List[str] = []
+    last_assistant: Optional[str] = None
+    for m in reversed(messages):
+        role = m.get("role")
+        if role == "user" and len(recent_user) < 3:
+            recent_user.append(m["content"])
+        elif role == "assistant" and last_assistant is None:
+            last_assistant = m["content"]
+        if len(recent_user) == 3 and last_assistant is not None:
+            break
+    recent_user.reverse()
+    return " ".join(recent_user).lower(), (last_assistant or "").lower()
+
+
+# Exact-match cache for completions that came back without tool calls. The key
+# hashes the whole request (model, temperature, messages, tool names), so any
+# change in context or tool results is a miss; only low temperatures are cached.
+_COMPLETION_CACHE_TTL_SECONDS = 1800
+_COMPLETION_CACHE_MAX_ENTRIES = 1000
+_COMPLETION_CACHE_MAX_TEMPERATURE = 0.2
+_completion_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+# Guards the module-level LRU caches; requests (and tool workers) run on many threads
+_cache_lock = threading.Lock()
+
+
+def _completion_cache_key(model: str, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]],
+                          temperature: float, tool_choice: Optional[str]) -> str:
+    payload = json.dumps({
+        "model": model,
+        "temperature": temperature,
+        "tool_choice": tool_choice,
+        "tools": [t["function"]["name"] for t in tools or []],
+        "messages": messages,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _completion_cache_get(key: str) -> Optional[str]:
+    with _cache_lock:
+        rec = _completion_cache.get(key)
+        if not rec:
+            return None
+        ts, content = rec
+        if (time.monotonic() - ts) > _COMPLETION_CACHE_TTL_SECONDS:
+            _completion_cache.pop(key, None)
+            return None
+        _completion_cache.move_to_end(key)
+        return content
+
+
+def _completion_cache_set(key: str, content: str) -> None:
+    with _cache_lock:
+        _completion_cache[key] = (time.monotonic(), content)
+        _completion_cache.move_to_end(key)
+        while len(_completion_cache) > _COMPLETION_CACHE_MAX_ENTRIES:
+            _completion_cache.popitem(last=False)
+
+
+# Pooled connections parallel tool calls leave free for other requests
+_POOL_RESERVE = 2
+
+
+SYSTEM_PROMPT = (
+    "You are a helpful multi‑agent assistant for a weight tracking app. "
+    "Agents: planner (decide), sql (query/aggregate), analytics (compute), action (mutations), admin (org/meta), responder (finalize). "
+    "Use function tools for database reads/writes only when the user asks for data-driven help. "
+    "Do NOT call admin tools unless the user explicitly asks about users, accounts, tables, schema, backups, migrations, or admin/system topics. "
+    "For casual greetings or small talk, respond briefly and do not use tools. "
+    "When creating users via admin_create_user, proceed if name and password are provided; email is optional. Do not perform unrelated actions. "
+    "If the user confirms an action with 'yes', 'okay', 'go ahead', etc., and your previous turn proposed that specific action (e.g., cancel a target), you MUST perform it using the appropriate user_* tool and then confirm the outcome. "
+    "For admin deletions where the user specifies a name (e.g., 'delete user bobo'), first resolve the user by name via admin_get_user_by_name or directly call admin_delete_user_by_name. Only use admin_delete_user when you have a user_id. "
+    "When cancelling a target, prefer setting status to 'cancelled' using user_update_target (with target_id) or user_update_active_target, rather than deleting the record. "
+    "To grant or revoke admin privileges, resolve the user (by name or id) and call admin_update_user with is_admin set to true/false, then verify via admin_list_users. "
+    "To promote all non-admin users, prefer calling admin_promote_all_non_admins (admin) and then verify results via admin_list_users. "
+    "CRITICAL ACTION EXECUTION RULES: "
+    "1. When user requests delete/add/update, you MUST call the tool immediately in the SAME response - do not say you will do it, DO IT NOW. "
+    "2. For weight deletions: Call sql_query to get weight_id AND user_delete_weight in the SAME turn (you can make multiple tool calls). "
+    "3. BANNED PHRASES: Never say 'I will proceed', 'I will delete', 'proceeding with', 'let me delete', or any future tense about actions. "
+    "4. CORRECT PATTERN: Make tool calls silently, then report the outcome (e.g., 'Weight entry deleted' after calling user_delete_weight). "
+    "5. If you find yourself writing 'I will' or 'proceeding', STOP - call the actual tool instead of describing what you'll do. "
+    "If you cannot perform the action due to a missing tool (e.g., no admin_update_user available), say explicitly which tool is missing and do not claim success. "
+    "When answering with data, be concise and numeric; cite dates/units and table/field names when helpful. "
+    "When you compute numeric metrics, include a final fenced JSON block (```json ... ```) with a small schema so the app can render it. For averages, use: {\"type\":\"metrics\", \"per_day\": number, \"per_week\": number, \"per_month\": number, \"delta_kg\": number, \"days\": number, \"period\": {\"from\": \"YYYY-MM-DD\", \"to\": \"YYYY-MM-DD\"}}. Avoid LaTeX formatting in text."
+)
+
+
+# Long conversations: older turns are folded into a short model-written summary
+# and only the tail is sent verbatim. The cut point advances in fixed blocks so
+# the summarized prefix (and its cache entry) stays the same for several turns.
+_HISTORY_WINDOW = 12
+_HISTORY_MIN_VERBATIM = 4
+_HISTORY_SUMMARY_BLOCK = 8
+_HISTORY_SUMMARY_MODEL = "gpt-4o-mini"
+_HISTORY_SUMMARY_MAX_ENTRIES = 500
+_history_summary_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+# Combined tool schemas per active agent combination. Agent schemas are static
+# module tuples (AdminAgent is only added for admins), so each of the handful of
+# combinations is assembled once per process. The lists are shared: never mutate.
+_toolset_cache: Dict[Tuple[type, ...], Tuple[List[Dict[str, Any]], Dict[str, int]]] = {}
+
+
 class ChatOrchestrator:
     def __init__(self, model: Optional[str] = None):
+        settings = get_settings().llm
         self.model = model or (settings.model_id or "gpt-4o")
         if OpenAI is None:
             raise RuntimeError("OpenAI client not available")
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY not configured")
         self.client = OpenAI(api_key=settings.openai_api_key)
+        self.tool_concurrency = max(1, settings.tool_concurrency_limit)
 
     def build_system_prompt(self) -> str:
-        return (
-            "You are a helpful multi‑agent assistant for a weight tracking app. "
-            "Agents: planner (decide), sql (query/aggregate), analytics (compute), action (mutations), admin (org/meta), responder (finalize). "
-            "Use function tools for database reads/writes only when the user asks for data-driven help. "
-            "Do NOT call admin tools unless the user explicitly asks about users, accounts, tables, schema, backups, migrations, or admin/system topics. "
-            "For casual greetings or small talk, respond briefly and do not use tools. "
-            "When creating users via admin_create_user, proceed if name and password are provided; email is optional. Do not perform unrelated actions. "
-            "If the user confirms an action with 'yes', 'okay', 'go ahead', etc., and your previous turn proposed that specific action (e.g., cancel a target), you MUST perform it using the appropriate user_* tool and then confirm the outcome. "
-            "For admin deletions where the user specifies a name (e.g., 'delete user bobo'), first resolve the user by name via admin_get_user_by_name or directly call admin_delete_user_by_name. Only use admin_delete_user when you have a user_id. "
-            "When cancelling a target, prefer setting status to 'cancelled' using user_update_target (with target_id) or user_update_active_target, rather than deleting the record. "
-            "To grant or revoke admin privileges, resolve the user (by name or id) and call admin_update_user with is_admin set to true/false, then verify via admin_list_users. "
-            "To promote all non-admin users, prefer calling admin_promote_all_non_admins (admin) and then verify results via admin_list_users. "
-            "CRITICAL ACTION EXECUTION RULES: "
-            "1. When user requests delete/add/update, you MUST call the tool immediately in the SAME response - do not say you will do it, DO IT NOW. "
-            "2. For weight deletions: Call sql_query to get weight_id AND user_delete_weight in the SAME turn (you can make multiple tool calls). "
-            "3. BANNED PHRASES: Never say 'I will proceed', 'I will delete', 'proceeding with', 'let me delete', or any future tense about actions. "
-            "4. CORRECT PATTERN: Make tool calls silently, then report the outcome (e.g., 'Weight entry deleted' after calling user_delete_weight). "
-            "5. If you find yourself writing 'I will' or 'proceeding', STOP - call the actual tool instead of describing what you'll do. "
-            "If you cannot perform the action due to a missing tool (e.g., no admin_update_user available), say explicitly which tool is missing and do not claim success. "
-            "When answering with data, be concise and numeric; cite dates/units and table/field names when helpful. "
-            "When you compute numeric metrics, include a final fenced JSON block (```json ... ```) with a small schema so the app can render it. For averages, use: {\"type\":\"metrics\", \"per_day\": number, \"per_week\": number, \"per_month\": number, \"delta_kg\": number, \"days\": number, \"period\": {\"from\": \"YYYY-MM-DD\", \"to\": \"YYYY-MM-DD\"}}. Avoid LaTeX formatting in text."
-        )
-
-    def build_context(self, db: Session, user: models.User) -> str:
-        schema = summarize_schema()
-        uctx = gather_user_context(db, user)
-        return (
-            "Context:\n"
-            "- Database Schema:\n" + schema + "\n\n"
-            "- User Data (scoped to current user):\n" + str(uctx)
-        )
-
-    def _aggregate_tools(self, agents: List[BaseAgent]) -> List[Dict[str, Any]]:
-        tools: List[Dict[str, Any]] = []
-        for a in agents:
-            tools.extend(a.tools())
-        return tools
-
-    def _exec_tool(self, agents: List[BaseAgent], name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        for a in agents:
-            res = a.execute(name, args)
-            if res is not None:
-                return {"tool": name, "ok": True, "data": res}
+        return SYSTEM_PROMPT
+
+    # The prompt prefix is system prompt + schema context, byte-identical for every
+    # user and turn so providers can reuse their prompt cache; per-user data follows it.
+    def build_static_schema_context(self) -> str:
+        return "Context:\n- Database Schema:\n" + summarize_schema()
+
+    def build_dynamic_user_context(self, db: Session, user: models.User) -> str:
+        return "Context:\n- User Data (scoped to current user):\n" + str(gather_user_context(db, user))
+
+    def _aggregate_tools(self, agents: List[BaseAgent]) -> Tuple[List[Dict[str, Any]], Dict[str, BaseAgent]]:
+        """Return the combined tool schemas and a {tool name: owning agent} map."""
+        key = tuple(type(a) for a in agents)
+        cached = _toolset_cache.get(key)
+        if cached is None:
+            tools: List[Dict[str, Any]] = []
+            owner_index: Dict[str, int] = {}
+            for i, a in enumerate(agents):
+                for t in a.tools():
+                    tools.append(t)
+                    owner_index[t["function"]["name"]] = i
+            cached = _toolset_cache[key] = (tools, owner_index)
+        tools, owner_index = cached
+        return tools, {name: agents[i] for name, i in owner_index.items()}
+
+    def _exec_tool(self, tool_owner: Dict[str, BaseAgent], name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        agent = tool_owner.get(name)
+        res = agent.execute(name, args) if agent is not None else None
+        if res is not None:
+            return {"tool": name, "ok": True, "data": res}
         return {"tool": name, "ok": False, "data": {"error": f"Unknown tool: {name}"}}
 
+    def _run_tool_calls(self, tool_owner: Dict[str, BaseAgent], calls: List[Tuple[str, Dict[str, Any]]],
+                        user: models.User, db: Session) -> List[Dict[str, Any]]:
+        """Execute one turn's (name, args) tool calls; results come back in call order."""
+        # Independent reads from one turn overlap; any write keeps the whole batch serial
+        workers = 1
+        if all(n in tool_owner and tool_owner[n].read_only for n, _ in calls):
+            workers = self._tool_workers(len(calls))
+        if workers <= 1:
+            return [self._exec_tool(tool_owner, n, a) for n, a in calls]
+        # Resolve everything from the request session here, on the request thread
+        uid, read_cache = user.id, session_read_cache(db)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                lambda c: self._exec_tool_isolated(type(tool_owner[c[0]]), uid, read_cache, c[0], c[1]), calls
+            ))
+
+    def _tool_workers(self, n_calls: int) -> int:
+        """Threads for a batch of read-only calls; each takes its own pooled connection."""
+        workers = min(self.tool_concurrency, n_calls)
+        headroom = pool_headroom()
+        if headroom is not None:
+            # Only use connections that are free now, leaving a few for other requests
+            workers = min(workers, headroom - _POOL_RESERVE)
+        return workers
+
+    def _exec_tool_isolated(self, agent_cls: type, user_id: int, read_cache: Dict[tuple, Any],
+                            name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        # Sessions are not thread-safe: each concurrent read gets its own session, agent and
+        # user instance (never touch the request session's objects from a worker thread)
+        db = SessionLocal()
+        try:
+            share_read_cache(db, read_cache)
+            user = db.get(models.User, user_id)
+            if user is None:
+                return {"tool": name, "ok": False, "data": {"error": "User not found"}}
+            return self._exec_tool({name: agent_cls(db, user)}, name, args)
+        finally:
+            db.close()
+
+    def _summarize_history(self, older: List[Dict[str, str]]) -> Optional[str]:
+        """Summarize earlier turns with a small model; None when the call fails."""
+        transcript = "\n".join(f"{m.get('role')}: {(m.get('content') or '')[:500]}" for m in older)
+        key = hashlib.sha256(transcript.encode("utf-8")).hexdigest()
+        with _cache_lock:
+            cached = _history_summary_cache.get(key)
+            if cached is not None:
+                _history_summary_cache.move_to_end(key)
+                return cached
+        try:
+            completion = self.client.chat.completions.create(
+                model=_HISTORY_SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": (
+                        "Summarize this earlier part of a conversation between a user and a weight tracking assistant "
+                        "in at most 150 tokens. Keep names, numbers, dates, and any pending requests or confirmations."
+                    )},
+                    {"role": "user", "content": transcript},
+                ],
+                temperature=0,
+                max_tokens=200,
+            )
+            summary = (completion.choices[0].message.content or "").strip()
+        except Exception:
+            return None
+        if not summary:
+            return None
+        with _cache_lock:
+            _history_summary_cache[key] = summary
+            while len(_history_summary_cache) > _HISTORY_SUMMARY_MAX_ENTRIES:
+                _history_summary_cache.popitem(last=False)
+        return summary
+
+    def _history_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        if len(messages) <= _HISTORY_WINDOW:
+            return list(messages)
+        cut = ((len(messages) - _HISTORY_MIN_VERBATIM) // _HISTORY_SUMMARY_BLOCK) * _HISTORY_SUMMARY_BLOCK
+        summary = self._summarize_history(messages[:cut])
+        if summary is None:
+            return messages[-_HISTORY_WINDOW:]
+        return [{"role": "system", "content": "Prior conversation summary: " + summary}, *messages[cut:]]
+
+    def _complete(self,
+                  chat_msgs: List[Dict[str, Any]],
+                  temperature: float,
+                  tools: Optional[List[Dict[str, Any]]] = None,
+                  tool_choice: Optional[str] = None,
+                  ) -> Any:
+        key = None
+        if temperature <= _COMPLETION_CACHE_MAX_TEMPERATURE:
+            key = _completion_cache_key(self.model, chat_msgs, tools, temperature, tool_choice)
+            cached = _completion_cache_get(key)
+            if cached is not None:
+                return _LocalMsg(content=cached)
+        kwargs: Dict[str, Any] = {"model": self.model, "messages": chat_msgs, "temperature": temperature}
+        if tools is not None:
+            kwargs["tools"] = tools
+            kwargs["tool_choice"] = tool_choice
+        msg = self.client.chat.completions.create(**kwargs).choices[0].message
+        if key is not None and not getattr(msg, "tool_calls", None) and msg.content is not None:
+            _completion_cache_set(key, msg.content)
+        return msg
+
     def run_sync(self,
                  messages: List[Dict[str, str]],
                  user: models.User,
@@ -77,50 +352,26 @@ class ChatOrchestrator:
                  ) -> str:
         # Build agents
         # Intent gating: include only relevant agents to reduce off-topic tool calls
-        last_user_msg = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
-        last_assistant_msg = next((m["content"] for m in reversed(messages) if m.get("role") == "assistant"), "")
-        # Combine a small window of recent user messages to preserve ongoing intent (e.g., follow-ups like "password is ...")
-        recent_user_msgs = " ".join([m["content"] for m in messages if m.get("role") == "user"][ -3: ])
-        _lu = (recent_user_msgs or last_user_msg or "").lower()
-        _la = (last_assistant_msg or "").lower()
-
-        admin_intent = any(k in _lu for k in [
-            "admin", "user ", "users", "accounts", "account",
-            "schema", "table", "tables", "database", "db",
-            "backup", "migrate", "migration", "org", "organization",
-            "create user", "new user", "set password", "password",
-            "make admin", "admin privileges", "promote", "elevate",
-            "revoke admin", "remove admin", "remove admin privileges", "demote", "unadmin"
-        ])
-        weight_intent = any(k in _lu for k in [
-            "weight", "weigh", "bmi", "target", "goal", "trend", "streak", "log", "record", "kg", "lbs"
-        ])
-        # Direct action verbs and synonyms from the user
-        action_verbs = [
-            "create", "add", "update", "delete", "set", "cancel", "remove",
-            "grant", "promote", "make admin", "admin privileges", "elevate",
-            "revoke", "demote", "remove admin", "remove admin privileges", "unadmin"
-        ]
-        action_intent = any(v in _lu for v in action_verbs) and (weight_intent or "target" in _lu or "user" in _lu or "users" in _lu)
+        _lu, _la = _intent_text(messages)
+
+        admin_intent = _ADMIN_INTENT_RE.search(_lu) is not None
+        weight_intent = _WEIGHT_INTENT_RE.search(_lu) is not None
+        action_intent = _ACTION_VERB_RE.search(_lu) is not None and (weight_intent or "target" in _lu or "user" in _lu or "users" in _lu)
 
         # Confirmation follow-up to an assistant's proposed action (e.g., user: "yes")
-        confirmation_phrases = ["yes", "yep", "sure", "ok", "okay", "go ahead", "please do", "confirm", "do it", "proceed"]
-        assistant_proposed_action = any(v in _la for v in [
-            "cancel", "delete", "update", "create", "set", "grant", "promote", "make admin", "admin privileges", "elevate",
-            "revoke", "demote", "remove admin", "remove admin privileges", "unadmin"
-        ]) and any(t in _la for t in ["target", "weight", "user", "users"])
-        is_confirmation = any(p in _lu for p in confirmation_phrases)
+        assistant_proposed_action = _PROPOSED_ACTION_RE.search(_la) is not None and _PROPOSAL_SUBJECT_RE.search(_la) is not None
+        is_confirmation = _CONFIRMATION_RE.search(_lu) is not None
         if assistant_proposed_action and is_confirmation:
             action_intent = True
             # infer weight intent if the proposal mentioned targets/weights
             if ("target" in _la) or ("weight" in _la):
                 weight_intent = True
             # infer admin intent if the proposal mentioned users/admin privileges
-            if ("user" in _la or "users" in _la) and any(k in _la for k in [
-                "admin", "make admin", "admin privileges", "revoke", "demote", "remove admin", "unadmin"
-            ]):
+            if ("user" in _la or "users" in _la) and _PROPOSED_ADMIN_RE.search(_la):
                 admin_intent = True
 
+        is_smalltalk = _SMALLTALK_RE.search(_lu) is not None and len(_lu) <= 60
+
         agents: List[BaseAgent] = []
         if weight_intent or action_intent:
             # Keep SQL/Analytics available when taking actions over targets/weights
@@ -129,23 +380,24 @@ class ChatOrchestrator:
             agents.append(ActionAgent(db, user))
         if user.is_admin and admin_intent:
             agents.append(AdminAgent(db, user))
-        tools = self._aggregate_tools(agents)
-        sys_prompt = self.build_system_prompt()
-        ctx = self.build_context(db, user)
-
-        # Deterministic admin grant/revoke execution for clear commands
-        if user.is_admin and admin_intent and any(k in _lu for k in [
-            "make admin", "grant admin", "promote", "admin privileges", "elevate", "revoke", "demote", "remove admin", "unadmin"
-        ]):
+        # Bare greetings with no data intent skip context building and the LLM entirely
+        if is_smalltalk and not agents and messages and messages[-1].get("role") == "user":
+            canned = _SMALLTALK_REPLIES.get(messages[-1]["content"].strip().strip(".!?, ").lower())
+            if canned:
+                if on_event:
+                    on_event("responder", "finalizing", None)
+                return canned
+        # Deterministic admin grant/revoke execution for clear commands; runs before any
+        # tool/context work since it answers without the LLM
+        if user.is_admin and admin_intent and _ADMIN_TOGGLE_RE.search(_lu):
             # Try to extract a username after 'user ' or last token as fallback
-            import re
             target_name = None
-            m = re.search(r"user\s+([A-Za-z0-9_\-\.]+)", _lu)
+            m = _USER_NAME_RE.search(_lu)
             if m:
                 target_name = m.group(1)
             if not target_name:
                 # Try simple 'from user NAME' or 'for NAME'
-                m2 = re.search(r"(?:from|for)\s+([A-Za-z0-9_\-\.]+)", _lu)
+                m2 = _FROM_FOR_NAME_RE.search(_lu)
                 if m2:
                     target_name = m2.group(1)
             # As a last resort, use last word
@@ -154,11 +406,11 @@ class ChatOrchestrator:
                 if parts:
                     target_name = parts[-1].strip(".,:;!?")
             if target_name:
-                revoke = any(k in _lu for k in ["revoke", "demote", "remove admin", "unadmin"])
-                grant = any(k in _lu for k in ["make admin", "promote", "grant admin", "admin privileges", "elevate"])
+                revoke = _REVOKE_RE.search(_lu) is not None
+                grant = _GRANT_RE.search(_lu) is not None
                 if revoke or grant:
                     try:
-                        admin_agent = AdminAgent(db, user)
+                        admin_agent = next((a for a in agents if isinstance(a, AdminAgent)), None) or AdminAgent(db, user)
                         info = admin_agent.execute("admin_get_user_by_name", {"name": target_name})
                         if not info or info.get("error"):
                             return f"Missing user: '{target_name}'."
@@ -171,32 +423,27 @@ class ChatOrchestrator:
                     except Exception as _e:
                         return f"Could not perform admin update: {_e}"
 
+        # Route each tool name straight to the agent that declares it
+        tools, tool_owner = self._aggregate_tools(agents)
+        sys_prompt = self.build_system_prompt()
+        schema_ctx = self.build_static_schema_context()
+        user_ctx = self.build_dynamic_user_context(db, user)
+
         chat_msgs: List[Dict[str, Any]] = [
             {"role": "system", "content": sys_prompt},
-            {"role": "system", "content": ctx},
+            {"role": "system", "content": schema_ctx},
+            {"role": "system", "content": user_ctx},
         ]
-        for m in messages[-12:]:
-            chat_msgs.append({"role": m["role"], "content": m["content"]})
+        # Callers already pass {"role", "content"} dicts; reuse them as-is
+        chat_msgs.extend(self._history_messages(messages))
 
         # First completion with tools
         if on_event:
             on_event("planner", "planning", None)
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=chat_msgs,
-            temperature=0.2,
-            tools=tools,
-            tool_choice=("required" if tools else "none"),
-        )
-        msg = completion.choices[0].message
+        msg = self._complete(chat_msgs, 0.2, tools, ("required" if tools else "none"))
         # Enforce grounding: if the model produced a direct answer without calling tools,
         # require a second pass that MUST utilize tools to fetch real data.
         # Only enforce tool usage when the user isn't making a casual/social request
-        smalltalk_phrases = [
-            "hi", "hello", "hey", "how are you", "good morning", "good evening",
-            "thanks", "thank you", "yo", "sup", "what's up", "bye", "goodbye"
-        ]
-        is_smalltalk = any(p in _lu for p in smalltalk_phrases) and len(_lu) <= 60
         # Also, if no relevant agents are active (no clear intent), do not force tools
         if not getattr(msg, "tool_calls", None) and not is_smalltalk and agents:
             if on_event:
@@ -214,14 +461,7 @@ class ChatOrchestrator:
                     "Do not acknowledge or promise actions without actually calling tools."
                 ),
             })
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=chat_msgs,
-                temperature=0.1,
-                tools=tools,
-                tool_choice=("required" if tools else "none"),
-            )
-            msg = completion.choices[0].message
+            msg = self._complete(chat_msgs, 0.1, tools, ("required" if tools else "none"))
         # Simple tool loop (max 6)
         steps = 0
         tool_used = False
@@ -230,32 +470,22 @@ class ChatOrchestrator:
             if on_event:
                 on_event("planner", "tool_call", {"count": len(msg.tool_calls)})
             chat_msgs.append({"role": "assistant", "content": msg.content or "", "tool_calls": [tc.model_dump() for tc in msg.tool_calls]})
+            calls = []
             for tc in msg.tool_calls:
                 name = tc.function.name
-                import json as _json
                 try:
-                    args = _json.loads(tc.function.arguments or "{}")
+                    args = json.loads(tc.function.arguments or "{}")
                 except Exception:
                     args = {}
-                # classify tool -> agent name
-                agent_name = "sql"
-                if name.startswith("user_") and ("weight_change" in name or "avg_weight_change" in name or "streak" in name):
-                    agent_name = "analytics"
-                elif name.startswith("user_") and ("create_" in name or "update_" in name or "delete_" in name):
-                    agent_name = "action"
-                elif name.startswith("admin_"):
-                    agent_name = "admin"
                 if on_event:
-                    on_event(agent_name, name, None)
-                result = self._exec_tool(agents, name, args)
-                chat_msgs.append({"role": "tool", "tool_call_id": tc.id, "name": name, "content": str(result)})
+                    owner = tool_owner.get(name)
+                    on_event(owner.name if owner is not None else "sql", name, None)
+                calls.append((tc, name, args))
+            results = self._run_tool_calls(tool_owner, [(n, a) for _, n, a in calls], user, db)
+            for (tc, name, _), result in zip(calls, results):
+                chat_msgs.append({"role": "tool", "tool_call_id": tc.id, "name": name, "content": json.dumps(result, default=str, separators=(",", ":"), ensure_ascii=False)})
                 tool_used = True
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=chat_msgs,
-                temperature=0.2,
-            )
-            msg = completion.choices[0].message
+            msg = self._complete(chat_msgs, 0.2)
 
         # Heuristic fallback: if admin intent and no tool was used (model still refused), attempt a minimal name-based admin update
         if user.is_admin and not tool_used and admin_intent:
@@ -274,25 +504,24 @@ class ChatOrchestrator:
                 parts = [p for p in lu.replace("\n"," ").split(" ") if p]
                 if parts:
                     target_name = parts[-1].strip(".,:;!?")
-            if any(k in lu for k in ["revoke", "demote", "remove admin", "unadmin"]):
+            if _REVOKE_RE.search(lu):
                 intent = "revoke"
-            elif any(k in lu for k in ["make admin", "promote", "grant", "admin privileges"]):
+            elif _FALLBACK_GRANT_RE.search(lu):
                 intent = "grant"
             if target_name and intent in ("revoke", "grant"):
                 try:
-                    # Build minimal agent set with AdminAgent only
-                    admin_agent = AdminAgent(db, user)
+                    admin_agent = next((a for a in agents if isinstance(a, AdminAgent)), None) or AdminAgent(db, user)
                     res1 = admin_agent.execute("admin_get_user_by_name", {"name": target_name}) or {"error": "User not found"}
                     if res1.get("error"):
-                        msg = type("obj", (), {"content": f"Sorry, I couldn't find a user named '{target_name}'."})
+                        msg = _LocalMsg(content=f"Sorry, I couldn't find a user named '{target_name}'.")
                     else:
                         uid = int(res1.get("id"))
                         upd = admin_agent.execute("admin_update_user", {"user_id": uid, "is_admin": intent == "grant"}) or {}
                         if upd.get("error"):
-                            msg = type("obj", (), {"content": f"Could not update admin status for '{target_name}': {upd.get('error')}"})
+                            msg = _LocalMsg(content=f"Could not update admin status for '{target_name}': {upd.get('error')}")
                         else:
                             new_flag = "Yes" if (upd.get("is_admin") is True or intent == "grant") else "No"
-                            msg = type("obj", (), {"content": f"Updated admin for '{target_name}'. Admin: {new_flag}."})
+                            msg = _LocalMsg(content=f"Updated admin for '{target_name}'. Admin: {new_flag}.")
                 except Exception:
                     pass
 
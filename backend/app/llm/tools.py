@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import date, datetime, timedelta
 
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect
+from sqlalchemy import inspect, select
 
 from .. import models
 from ..database import engine
@@ -33,13 +34,24 @@ def parse_date_str(s: str) -> Optional[date]:
         return None
 
 
+# Tables are created/migrated at startup, so a successful reflection is kept for
+# the process; set _schema_summary = None after altering the schema at runtime
+_schema_summary: Optional[str] = None
+
+
 def summarize_schema() -> str:
-    insp = inspect(engine)
+    global _schema_summary
+    if _schema_summary is not None:
+        return _schema_summary
     lines: List[str] = []
+    complete = True
     try:
-        tables = insp.get_table_names()
+        insp = inspect(engine)
+        # Sorted so the summary text is identical across processes
+        tables = sorted(insp.get_table_names())
     except Exception:
         tables = []
+        complete = False
     for t in tables:
         try:
             cols = insp.get_columns(t)
@@ -52,7 +64,27 @@ def summarize_schema() -> str:
             lines.append(f"{t}({', '.join(col_parts)})")
         except Exception:
             lines.append(f"{t}(<unavailable>)")
-    return "\n".join(lines)
+            complete = False
+    summary = "\n".join(lines)
+    # Don't pin a partial summary from a transient failure (e.g. DB not up yet)
+    if complete:
+        _schema_summary = summary
+    return summary
+
+
+# Per-user chat context reused across back-to-back turns. Entries are only
+# valid for the same profile version (updated_at) and local day; agent and
+# REST writes drop them through invalidate_user_context.
+_USER_CONTEXT_TTL_SECONDS = 60
+_user_context_cache: Dict[int, Tuple[float, tuple, Dict[str, Any]]] = {}
+
+
+def invalidate_user_context(user_id: Optional[int] = None) -> None:
+    """Forget cached chat context for one user, or for everyone when no id is given."""
+    if user_id is None:
+        _user_context_cache.clear()
+    else:
+        _user_context_cache.pop(user_id, None)
 
 
 def gather_user_context(db: Session, user: models.User) -> Dict[str, Any]:
@@ -68,6 +100,11 @@ def gather_user_context(db: Session, user: models.User) -> Dict[str, Any]:
     print(f"[CONTEXT-DEBUG] User {user.id} timezone: {user.timezone} -> using: {user_timezone}", flush=True, file=sys.stderr)
     print(f"[CONTEXT-DEBUG] Calculated today: {user_today}", flush=True, file=sys.stderr)
 
+    version = (user.updated_at, user_today)
+    rec = _user_context_cache.get(user.id)
+    if rec and rec[1] == version and (time.monotonic() - rec[0]) <= _USER_CONTEXT_TTL_SECONDS:
+        return rec[2]
+
     ctx: Dict[str, Any] = {}
     ctx["user_profile"] = {
         "id": user.id,
@@ -82,24 +119,25 @@ def gather_user_context(db: Session, user: models.User) -> Dict[str, Any]:
         "timezone": user_timezone,
         "today": user_today.isoformat(),
     }
-    # latest 30 weights (quick context only)
-    weights = (
-        db.query(models.Weight)
-        .filter(models.Weight.user_id == user.id)
-        .order_by(models.Weight.date_of_measurement.desc())
+    # latest 30 weights (quick context only); plain column rows, no ORM hydration
+    W = models.Weight
+    rows = db.execute(
+        select(W.date_of_measurement, W.weight, W.body_fat_percentage, W.muscle_mass, W.notes)
+        .where(W.user_id == user.id)
+        .order_by(W.date_of_measurement.desc())
         .limit(30)
-        .all()
-    )
+    ).all()
     ctx["recent_weights"] = [
         {
-            "date": w.date_of_measurement.isoformat() if w.date_of_measurement else None,
-            "weight_kg": safe_float(w.weight),
-            "body_fat_pct": safe_float(w.body_fat_percentage),
-            "muscle_mass": safe_float(w.muscle_mass),
-            "notes": w.notes,
+            "date": dom.isoformat() if dom else None,
+            "weight_kg": safe_float(weight),
+            "body_fat_pct": safe_float(body_fat),
+            "muscle_mass": safe_float(muscle),
+            "notes": notes,
         }
-        for w in weights
+        for dom, weight, body_fat, muscle, notes in rows
     ]
+    _user_context_cache[user.id] = (time.monotonic(), version, ctx)
     return ctx
 
 
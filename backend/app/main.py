@@ -2,13 +2,15 @@
 Weight Tracker API - Main Application
 FastAPI backend for weight tracking with user authentication and analytics.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from datetime import datetime
+
+import orjson
 
 from .config import settings
-from .database import engine, Base
+from .database import engine, Base, prewarm_pool
+from .schema_migrations import apply_pending_migrations
 from .routers import auth, users, weights, targets, admin
 from .routers import insights
 from .routers import chat_v2
@@ -32,45 +34,13 @@ async def lifespan(app: FastAPI):
 
     Base.metadata.create_all(bind=engine)
 
-    # Run migrations to add updated_at column if it doesn't exist
-    from sqlalchemy import text
-    with engine.connect() as conn:
-        try:
-            # Add updated_at column to users table
-            conn.execute(text("""
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
-            """))
-            conn.execute(text("""
-                UPDATE users SET updated_at = created_at WHERE updated_at IS NULL;
-            """))
-
-            # Add updated_at column to target_weights table
-            conn.execute(text("""
-                ALTER TABLE target_weights ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
-            """))
-            conn.execute(text("""
-                UPDATE target_weights SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
-            """))
-
-            # Add timezone column to users table
-            conn.execute(text("""
-                ALTER TABLE users ADD COLUMN IF NOT EXISTS timezone VARCHAR(50) DEFAULT 'UTC';
-            """))
-            conn.execute(text("""
-                UPDATE users SET timezone = 'UTC' WHERE timezone IS NULL;
-            """))
-
-            # Add updated_at column to weights table
-            conn.execute(text("""
-                ALTER TABLE weights ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
-            """))
-            conn.execute(text("""
-                UPDATE weights SET updated_at = created_at WHERE updated_at IS NULL;
-            """))
-
-            conn.commit()
-        except Exception as e:
-            print(f"Migration note: {e}")
+    # Versioned SQL migrations (backend/migrations); normally already applied by
+    # run_migration.py at deploy time, in which case this is a single SELECT
+    applied = apply_pending_migrations(engine)
+    if applied:
+        print(f"Applied migrations: {', '.join(applied)}")
+
+    prewarm_pool()
 
     yield
     # Shutdown (if needed)
@@ -106,9 +76,7 @@ app.include_router(chat_v2.router)
 app.include_router(chat.router)
 
 
-@app.get("/")
-def root():
-    """Root endpoint - API status."""
+def _root_payload() -> dict:
     response = {
         "message": "Welcome to Weight Tracker API",
         "version": settings.app_version,
@@ -122,17 +90,7 @@ def root():
     return response
 
 
-@app.get("/health")
-def health_check():
-    """Health check endpoint for monitoring."""
-    return {"status": "healthy"}
-
-
-@app.get("/api/version")
-def version():
-    """Version information endpoint."""
-    import sys
-    print(f"[VERSION-CHECK] Version endpoint called at {datetime.now()}", flush=True, file=sys.stderr)
+def _version_payload() -> dict:
     response = {
         "app_name": settings.app_name,
         "version": settings.app_version,
@@ -145,6 +103,31 @@ def version():
     return response
 
 
+# Settings are frozen for the process lifetime, so these bodies are serialized once;
+# the handlers are async since they never block (no threadpool hop per request)
+_ROOT_BODY = orjson.dumps(_root_payload())
+_HEALTH_BODY = orjson.dumps({"status": "healthy"})
+_VERSION_BODY = orjson.dumps(_version_payload())
+
+
+@app.get("/")
+async def root():
+    """Root endpoint - API status."""
+    return Response(content=_ROOT_BODY, media_type="application/json")
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint for monitoring."""
+    return Response(content=_HEALTH_BODY, media_type="application/json")
+
+
+@app.get("/api/version")
+async def version():
+    """Version information endpoint."""
+    return Response(content=_VERSION_BODY, media_type="application/json")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for Weight Tracker database tables.
 """
-from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, Date, Boolean, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -24,10 +24,10 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # Relationships
-    weights = relationship("Weight", back_populates="user", cascade="all, delete-orphan")
-    targets = relationship("TargetWeight", back_populates="user", cascade="all, delete-orphan")
-    reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan")
+    # Relationships (child rows are removed by the FKs' ON DELETE CASCADE, not loaded and deleted one by one)
+    weights = relationship("Weight", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    targets = relationship("TargetWeight", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<User(id={self.id}, name={self.name})>"
@@ -67,6 +67,14 @@ class Weight(Base):
 
     # Relationships
     user = relationship("User", back_populates="weights")
+
+    # Per-user history lookups (latest/earliest entry, date ranges) walk this index
+    __table_args__ = (
+        Index("ix_weights_user_date", "user_id", date_of_measurement.desc()),
+        # weights_aggregate min/max: seek straight to the extreme weight and its latest date
+        Index("ix_weights_user_weight_date", "user_id", weight.desc(), date_of_measurement.desc()),
+        UniqueConstraint("user_id", "date_of_measurement", name="uq_weights_user_date"),
+    )
     
     def __repr__(self):
         return f"<Weight(id={self.id}, user_id={self.user_id}, weight={self.weight})>"
@@ -86,6 +94,12 @@ class TargetWeight(Base):
 
     # Relationships
     user = relationship("User", back_populates="targets")
+
+    # Per-user target listings, newest first (by target date and by creation)
+    __table_args__ = (
+        Index("ix_target_weights_user_target_date", "user_id", date_of_target.desc()),
+        Index("ix_target_weights_user_created", "user_id", created_date.desc()),
+    )
     
     def __repr__(self):
         return f"<TargetWeight(id={self.id}, user_id={self.user_id}, target={self.target_weight})>"
@@ -1,26 +1,83 @@
 """
 Admin routes: user management and cross-user maintenance actions.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
 from .. import models, schemas
 from ..auth import get_current_admin_user
-from .users import calculate_target_progress
+from ..llm.agents import invalidate_users_count
+from ..llm.tools import invalidate_user_context
+from .users import calculate_target_progress, get_weight_series
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
+# Columns backing schemas.User, for listing without full ORM hydration
+_USER_LIST_COLUMNS = (
+    models.User.id,
+    models.User.name,
+    models.User.sex,
+    models.User.height,
+    models.User.activity_level,
+    models.User.date_of_birth,
+    models.User.email,
+    models.User.timezone,
+    models.User.is_admin,
+    models.User.created_at,
+)
+
+
+def _identity_conflict(db: Session, name: str = None, email: str = None, exclude_id: int = None) -> str:
+    """Return "name" or "email" if another user already has it (name checked first), else None.
+
+    One round trip for both fields; the email UNIQUE constraint still backstops races on commit.
+    """
+    conditions = []
+    if name:
+        conditions.append(models.User.name == name)
+    if email:
+        conditions.append(models.User.email == email)
+    if not conditions:
+        return None
+    stmt = select(models.User.name, models.User.email).where(or_(*conditions)).limit(2)
+    if exclude_id is not None:
+        stmt = stmt.where(models.User.id != exclude_id)
+    rows = db.execute(stmt).all()
+    if name and any(row.name == name for row in rows):
+        return "name"
+    return "email" if rows else None
+
+
+def _is_email_conflict(exc: IntegrityError) -> bool:
+    """True when the violated constraint is the users.email UNIQUE one (users_email_key)."""
+    diag = getattr(exc.orig, "diag", None)
+    return "email" in (getattr(diag, "constraint_name", None) or "")
+
 
 @router.get("/users", response_model=List[schemas.User])
 def list_users(
+    limit: int = Query(100, ge=1, le=500),
+    after_id: int = Query(0, ge=0),
     admin_user: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """List all users (admin only)."""
-    users = db.query(models.User).order_by(models.User.id).all()
-    return users
+    """List users ordered by id (admin only).
+
+    - **limit**: Maximum number of users to return
+    - **after_id**: Return users with id greater than this (pass the last id of the previous page)
+    """
+    # Keyset page over the PK; select only the response columns instead of hydrating ORM users
+    rows = db.execute(
+        select(*_USER_LIST_COLUMNS)
+        .where(models.User.id > after_id)
+        .order_by(models.User.id)
+        .limit(limit)
+    ).mappings()
+    return [dict(row) for row in rows]
 
 
 @router.post("/users", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
@@ -37,13 +94,11 @@ def create_user(
     """
     from ..auth import get_password_hash
     # Uniqueness checks
-    existing_user = db.query(models.User).filter(models.User.name == user.name).first()
-    if existing_user:
+    conflict = _identity_conflict(db, name=user.name, email=user.email)
+    if conflict == "name":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
-    if user.email:
-        existing_email = db.query(models.User).filter(models.User.email == user.email).first()
-        if existing_email:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    if conflict == "email":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
     db_user = models.User(
         name=user.name,
@@ -56,7 +111,14 @@ def create_user(
         is_admin=bool(is_admin),
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not _is_email_conflict(e):
+            raise
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    invalidate_users_count()
     db.refresh(db_user)
     return db_user
 
@@ -69,26 +131,21 @@ def update_user(
     db: Session = Depends(get_db)
 ):
     """Update a user's profile fields (admin only)."""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    # Name uniqueness
+    # Name/email uniqueness
+    conflict = _identity_conflict(db, name=data.name, email=data.email, exclude_id=user_id)
+    if conflict == "name":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
+    if conflict == "email":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use")
+
     if data.name is not None:
-        existing = db.query(models.User).filter(models.User.name == data.name, models.User.id != user_id).first()
-        if existing:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
         user.name = data.name
-
-    # Email uniqueness
     if data.email is not None:
-        if data.email:
-            existing_email = db.query(models.User).filter(models.User.email == data.email, models.User.id != user_id).first()
-            if existing_email:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use")
-            user.email = data.email
-        else:
-            user.email = None
+        user.email = data.email or None
 
     if data.sex is not None:
         user.sex = data.sex
@@ -99,7 +156,13 @@ def update_user(
     if data.date_of_birth is not None:
         user.date_of_birth = data.date_of_birth
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not _is_email_conflict(e):
+            raise
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use")
     db.refresh(user)
     return user
 
@@ -112,7 +175,7 @@ def set_user_admin(
     db: Session = Depends(get_db)
 ):
     """Grant or revoke admin status for a user (admin only)."""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     user.is_admin = bool(is_admin)
@@ -128,7 +191,7 @@ def get_user_detail(
     db: Session = Depends(get_db)
 ):
     """Get a user's full profile information (admin only)."""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
@@ -142,11 +205,11 @@ def get_user_targets(
 ):
     """List a user's targets with progress (admin only)."""
     targets = db.query(models.TargetWeight).filter(models.TargetWeight.user_id == user_id).order_by(models.TargetWeight.date_of_target.desc()).all()
-    # Determine current weight for this user
-    latest_weight = db.query(models.Weight).filter(models.Weight.user_id == user_id).order_by(models.Weight.date_of_measurement.desc()).first()
-    current_weight = float(latest_weight.weight) if latest_weight else 0.0
+    # One query for the user's weight history answers every per-target lookup
+    series = get_weight_series(db, user_id)
+    current_weight = series[1][-1] if series[1] else 0.0
     enriched = [
-        calculate_target_progress(current_weight=current_weight, target=t, db=db)
+        calculate_target_progress(current_weight=current_weight, target=t, db=db, weight_series=series)
         for t in targets
     ]
     return enriched
@@ -159,11 +222,13 @@ def delete_user(
     db: Session = Depends(get_db)
 ):
     """Delete a user account (admin only). Cascades to weights/targets."""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    # One statement; the weights/targets/reset-token FKs are ON DELETE CASCADE
+    result = db.execute(delete(models.User).where(models.User.id == user_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    db.delete(user)
     db.commit()
+    invalidate_users_count()
+    invalidate_user_context(user_id)
     return None
 
 
@@ -177,7 +242,7 @@ def set_user_password(
     """Set a new password for a user (admin only)."""
     if not new_password or len(new_password) < 8:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password must be at least 8 characters")
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     from ..auth import get_password_hash
@@ -192,9 +257,11 @@ def admin_delete_target(
     db: Session = Depends(get_db)
 ):
     """Delete any target goal by ID (admin only)."""
-    target = db.query(models.TargetWeight).filter(models.TargetWeight.id == target_id).first()
+    target = db.get(models.TargetWeight, target_id)
     if not target:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Target not found")
+    owner_id = target.user_id
     db.delete(target)
     db.commit()
+    invalidate_user_context(owner_id)
     return None
@@ -1,7 +1,7 @@
 """
 Authentication routes: login, signup, token management.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 import logging
@@ -28,6 +28,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+
+def _send_email_task(send_fn, to_email: str, value: str, description: str) -> None:
+    """
+    Send an email after the response has been returned, logging failures.
+    Used for notifications whose outcome does not change the API response.
+    """
+    if not send_fn(to_email, value):
+        logger.warning(f"Failed to send {description} email to {to_email}")
+
+
 @router.post("/signup", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """
@@ -147,6 +157,7 @@ def change_password(
 @router.post("/forgot-password", status_code=status.HTTP_200_OK)
 def forgot_password(
     request: schemas.ForgotPasswordRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -188,12 +199,11 @@ def forgot_password(
     frontend_url = getattr(settings, 'frontend_url', 'https://agentic-health-tracker.vercel.app')
     reset_url = f"{frontend_url}/reset-password?token={reset_token}"
 
-    # Send reset link email
-    email_sent = send_password_reset_link_email(request.email, reset_url)
-
-    if not email_sent:
-        logger.warning(f"Failed to send password reset email to {request.email}")
-        # Still return success to prevent enumeration
+    # Send reset link email once the response is on its way
+    # (failures are only logged; the response is the same to prevent enumeration)
+    background_tasks.add_task(
+        _send_email_task, send_password_reset_link_email, request.email, reset_url, "password reset"
+    )
 
     return {
         "message": "If an account exists with this email, a password reset link has been sent."
@@ -252,6 +262,7 @@ def verify_reset_token(
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
 def reset_password(
     request: schemas.ResetPasswordRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -317,14 +328,15 @@ def reset_password(
 
         db.commit()
 
-        # Send confirmation email
+        # Send confirmation email in the background
         if user.email:
-            email_sent = send_password_reset_confirmation_email(
+            background_tasks.add_task(
+                _send_email_task,
+                send_password_reset_confirmation_email,
                 user.email,
-                user.name
+                user.name,
+                "password reset confirmation",
             )
-            if not email_sent:
-                logger.warning(f"Failed to send password reset confirmation email to {user.email}")
 
         return {
             "message": "Password reset successfully. You can now log in with your new password.",
@@ -8,7 +8,7 @@ POST /api/chat
   * Current user's profile and recent data (weights, targets)
   * Optional extra tables if present (achievements, streaks, user_preferences)
 
-Environment: settings.openai_api_key must be set (OPENAI_API_KEY).
+Environment: settings.llm.openai_api_key must be set (OPENAI_API_KEY).
 """
 from typing import List, Optional, Dict, Any
 from datetime import date, timedelta, datetime
@@ -344,7 +344,7 @@ def chat(
 ):
     if OpenAI is None:
         raise HTTPException(status_code=500, detail="OpenAI client not available. Ensure dependency is installed.")
-    if not settings.openai_api_key:
+    if not settings.llm.openai_api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured on server.")
 
     # Prepare context with user's timezone
@@ -851,8 +851,8 @@ def chat(
             return _tool_result(name, {"error": str(e)}, ok=False)
 
     try:
-        client = OpenAI(api_key=settings.openai_api_key)
-        model_name = settings.model_id or "gpt-4o"
+        client = OpenAI(api_key=settings.llm.openai_api_key)
+        model_name = settings.llm.model_id or "gpt-4o"
         # First completion with optional tools
         completion = client.chat.completions.create(
             model=model_name,
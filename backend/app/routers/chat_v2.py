@@ -16,10 +16,9 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from .. import models
-from ..auth import get_current_user
+from ..auth import get_agent_user, get_current_user, SECRET_KEY, ALGORITHM
 from ..database import get_db
 from ..llm.orchestrator import ChatOrchestrator
-from ..config import settings
 from jose import jwt, JWTError
 
 
@@ -42,7 +41,7 @@ class ChatResponse(BaseModel):
 @router.post("", response_model=ChatResponse)
 def chat_v2(
     payload: ChatRequest,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_agent_user),
     db: Session = Depends(get_db),
 ):
     try:
@@ -104,7 +103,7 @@ def _task_set(task_id: str, **kwargs):
 @router.post("/task", response_model=Dict[str, str])
 def start_chat_task(
     payload: TaskStart,
-    current_user: models.User = Depends(get_current_user),
+    current_user: models.User = Depends(get_agent_user),
     db: Session = Depends(get_db),
 ):
     task_id = _new_task()
@@ -155,7 +154,7 @@ async def stream_chat_task(
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -9,8 +9,9 @@ from datetime import date
 
 from ..database import get_db
 from .. import models, schemas
-from .users import calculate_target_progress
+from .users import calculate_target_progress, get_weight_series
 from ..auth import get_current_user
+from ..llm.tools import invalidate_user_context
 
 router = APIRouter(prefix="/api/targets", tags=["Targets"])
 
@@ -54,6 +55,7 @@ def auto_close_expired_targets(db: Session, user_id: int) -> int:
 
     if closed_count > 0:
         db.commit()
+        invalidate_user_context(user_id)
 
     return closed_count
 
@@ -79,6 +81,7 @@ def create_target(
     
     db.add(db_target)
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(db_target)
     
     return db_target
@@ -124,14 +127,12 @@ async def list_targets(
     
     targets = query.order_by(desc(models.TargetWeight.date_of_target)).offset(skip).limit(limit).all()
 
-    # Compute enriched progress details per target
-    latest_weight = db.query(models.Weight).filter(
-        models.Weight.user_id == current_user.id
-    ).order_by(desc(models.Weight.date_of_measurement)).first()
-    current_weight = float(latest_weight.weight) if latest_weight else 0
+    # Compute enriched progress details per target from one weight-history query
+    series = get_weight_series(db, current_user.id)
+    current_weight = series[1][-1] if series[1] else 0
 
     enriched = [
-        calculate_target_progress(current_weight=current_weight, target=t, db=db)
+        calculate_target_progress(current_weight=current_weight, target=t, db=db, weight_series=series)
         for t in targets
     ]
     return enriched
@@ -215,6 +216,7 @@ def update_target(
         target.status = target_update.status
     
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(target)
     
     return target
@@ -242,6 +244,7 @@ def delete_target(
     
     db.delete(target)
     db.commit()
+    invalidate_user_context(current_user.id)
     
     return None
 
@@ -286,6 +289,7 @@ async def complete_target(
         target.status = "failed"
 
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(target)
 
     return target
@@ -313,6 +317,7 @@ async def cancel_target(
 
     target.status = "cancelled"
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(target)
 
     return target
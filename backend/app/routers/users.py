@@ -5,12 +5,15 @@ Enhanced with time-based weight change calculations and detailed target progress
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
+from bisect import bisect_right
 from datetime import date, timedelta
 from decimal import Decimal
+from typing import List, Optional, Tuple
 
 from ..database import get_db
 from .. import models, schemas
 from ..auth import get_current_user
+from ..llm.tools import invalidate_user_context
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
@@ -68,26 +71,63 @@ def get_weight_at_date(db: Session, user_id: int, target_date: date) -> float:
     return float(weight.weight) if weight else None
 
 
+def get_weight_series(db: Session, user_id: int) -> Tuple[List[date], List[float]]:
+    """Load a user's (dates, weights) history in date order with a single query."""
+    rows = db.query(models.Weight.date_of_measurement, models.Weight.weight).filter(
+        models.Weight.user_id == user_id
+    ).order_by(models.Weight.date_of_measurement).all()
+    return [r[0] for r in rows], [float(r[1]) for r in rows]
+
+
+def weight_at_date_in_series(series: Tuple[List[date], List[float]], target_date: date) -> Optional[float]:
+    """Same lookup as get_weight_at_date, over a series from get_weight_series."""
+    dates, weights = series
+    if not dates or target_date is None:
+        return None
+    # Latest weight on or before the date, else the earliest one after it
+    i = bisect_right(dates, target_date)
+    return weights[i - 1] if i else weights[0]
+
+
 def calculate_target_progress(
     current_weight: float,
     target: models.TargetWeight,
-    db: Session
+    db: Session,
+    weight_series: Optional[Tuple[List[date], List[float]]] = None,
 ) -> schemas.TargetWithProgress:
     """
     Calculate detailed progress information for a target.
+
+    Pass ``weight_series`` (from get_weight_series) when enriching several
+    targets of one user so weight lookups are answered in memory.
     """
+    if weight_series is not None:
+        def weight_at(d: date) -> Optional[float]:
+            return weight_at_date_in_series(weight_series, d)
+
+        def first_weight() -> Optional[float]:
+            return weight_series[1][0] if weight_series[1] else None
+    else:
+        def weight_at(d: date) -> Optional[float]:
+            return get_weight_at_date(db, target.user_id, d) if d is not None else None
+
+        def first_weight() -> Optional[float]:
+            first = db.query(models.Weight.weight).filter(
+                models.Weight.user_id == target.user_id
+            ).order_by(models.Weight.date_of_measurement).first()
+            return float(first[0]) if first else None
+
     # Normalize numeric types to float for arithmetic
     cw = float(current_weight) if current_weight is not None else 0.0
     target_weight = float(target.target_weight)
     
     # Get starting weight (weight at target creation date or closest before)
-    starting_weight = get_weight_at_date(db, target.user_id, target.created_date)
+    starting_weight = weight_at(target.created_date)
+    if starting_weight is None:
+        # No creation date (or no weights at all): fall back to the first weight entry
+        starting_weight = first_weight()
     if starting_weight is None:
-        # Fallback to first weight entry
-        first_weight = db.query(models.Weight).filter(
-            models.Weight.user_id == target.user_id
-        ).order_by(models.Weight.date_of_measurement).first()
-        starting_weight = float(first_weight.weight) if first_weight else cw
+        starting_weight = cw
     
     # Calculate progress
     total_to_lose = target_weight - starting_weight
@@ -107,7 +147,7 @@ def calculate_target_progress(
     if target.status == "active":
         final_weight_value = cw
     else:
-        fw = get_weight_at_date(db, target.user_id, target.date_of_target)
+        fw = weight_at(target.date_of_target)
         final_weight_value = float(fw) if fw is not None else current_weight
     
     # Calculate days remaining
@@ -118,7 +158,7 @@ def calculate_target_progress(
     if weight_to_lose > 0:
         # Get weight from 30 days ago to calculate rate
         thirty_days_ago = date.today() - timedelta(days=30)
-        weight_30_days_ago = get_weight_at_date(db, target.user_id, thirty_days_ago)
+        weight_30_days_ago = weight_at(thirty_days_ago)
         
         if weight_30_days_ago and weight_30_days_ago != cw:
             daily_rate = (weight_30_days_ago - cw) / 30
@@ -269,6 +309,7 @@ def update_my_profile(
         current_user.timezone = user_update.timezone
 
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(current_user)
     
     return current_user
@@ -10,6 +10,7 @@ from datetime import date, datetime
 from ..database import get_db
 from .. import models, schemas
 from ..auth import get_current_user
+from ..llm.tools import invalidate_user_context
 
 router = APIRouter(prefix="/api/weights", tags=["Weights"])
 
@@ -108,6 +109,7 @@ def create_weight(
     
     db.add(db_weight)
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(db_weight)
     
     return db_weight
@@ -246,6 +248,7 @@ def update_weight(
             weight.muscle_mass = est_lbm
     
     db.commit()
+    invalidate_user_context(current_user.id)
     db.refresh(weight)
     
     return weight
@@ -287,6 +290,7 @@ def backfill_estimates(
             updated += 1
     if updated:
         db.commit()
+        invalidate_user_context(current_user.id)
     return {"processed": len(weights), "updated": updated}
 
 
@@ -312,5 +316,6 @@ def delete_weight(
     
     db.delete(weight)
     db.commit()
+    invalidate_user_context(current_user.id)
     
     return None
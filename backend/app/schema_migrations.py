@@ -0,0 +1,107 @@
+"""
+Versioned SQL migrations.
+
+Files in ``backend/migrations`` named ``NNN_description.sql`` are applied in
+order, once each; applied versions are recorded in ``schema_migrations`` so a
+boot against an up-to-date database costs a single SELECT.
+
+A file whose first line is ``-- migrate: no-transaction`` runs in autocommit
+mode, so it may COMMIT between batches (e.g. a DO block backfilling in ranges).
+"""
+from pathlib import Path
+from typing import List, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+_NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+# Applied by hand (the old one-off run_migration.py) before versions were tracked;
+# create_all covers them on a fresh database. Recorded, never run, when
+# schema_migrations is first created: 002's unbatched UPDATE + SET NOT NULL is
+# exactly the long lock 003/005 avoid.
+_BASELINE_VERSIONS = ("001_add_password_reset_tokens", "002_add_updated_at_to_users")
+# pg_advisory_lock key held for a whole migration run (arbitrary, app-specific)
+_ADVISORY_LOCK_KEY = 804_117_203
+
+
+def _migration_files() -> List[Path]:
+    return sorted(MIGRATIONS_DIR.glob("[0-9][0-9][0-9]_*.sql"))
+
+
+def _applied_versions(conn: Connection) -> Set[str]:
+    try:
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+    except Exception:
+        conn.rollback()
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(
+            text("INSERT INTO schema_migrations (version) VALUES (:v)"),
+            [{"v": v} for v in _BASELINE_VERSIONS],
+        )
+        conn.commit()
+        return set(_BASELINE_VERSIONS)
+
+
+def _acquire_lock(conn: Connection) -> bool:
+    """Serialize runners (app workers booting together, run_migration.py) on Postgres."""
+    if conn.dialect.name != "postgresql":
+        return False
+    conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+    conn.commit()
+    return True
+
+
+def _release_lock(conn: Connection) -> None:
+    conn.rollback()
+    conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+    conn.commit()
+
+
+def apply_pending_migrations(engine: Engine, raise_errors: bool = False) -> List[str]:
+    """
+    Apply migration files not yet recorded in ``schema_migrations``, in order.
+
+    Each file runs in its own transaction (unless marked no-transaction). The
+    run stops at the first failing file, since later files may depend on it;
+    that file and everything after it stay pending for the next run. The
+    failure is printed, or re-raised when ``raise_errors`` is set. On Postgres
+    the whole run holds an advisory lock, so concurrent runners apply each
+    version once.
+    Returns the versions applied by this call.
+    """
+    applied: List[str] = []
+    with engine.connect() as conn:
+        locked = _acquire_lock(conn)
+        try:
+            # Read under the lock, so versions another runner just applied are skipped
+            done = _applied_versions(conn)
+            for path in _migration_files():
+                version = path.stem
+                if version in done:
+                    continue
+                sql = path.read_text()
+                try:
+                    if sql.startswith(_NO_TRANSACTION_MARKER):
+                        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as ac:
+                            ac.exec_driver_sql(sql)
+                    else:
+                        conn.exec_driver_sql(sql)
+                    conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+                    conn.commit()
+                    applied.append(version)
+                except Exception as e:
+                    conn.rollback()
+                    if raise_errors:
+                        raise
+                    print(f"Migration note ({version}): {e}; later migrations not applied")
+                    break
+        finally:
+            if locked:
+                _release_lock(conn)
+    return applied
@@ -0,0 +1,37 @@
+-- Migration: Add updated_at/timezone columns and per-user weight indexes
+-- Description: Adds columns only when missing, so re-running this file never
+-- touches populated tables; updated_at backfill is 005
+-- Date: 2026-10-16
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'updated_at') THEN
+        -- Added without a default so existing rows stay NULL for the batched backfill (005)
+        ALTER TABLE users ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE users ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+    END IF;
+
+    -- Existing rows take the constant default without a table rewrite
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'target_weights' AND column_name = 'updated_at') THEN
+        ALTER TABLE target_weights ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'timezone') THEN
+        ALTER TABLE users ADD COLUMN timezone VARCHAR(50) DEFAULT 'UTC';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'weights' AND column_name = 'updated_at') THEN
+        -- Added without a default so existing rows stay NULL for the batched backfill (005)
+        ALTER TABLE weights ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE weights ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+    END IF;
+
+    -- Composite indexes for per-user, date-ordered weight lookups
+    CREATE INDEX IF NOT EXISTS ix_weights_user_date ON weights (user_id, date_of_measurement DESC);
+    CREATE INDEX IF NOT EXISTS ix_weights_user_weight_date ON weights (user_id, weight DESC, date_of_measurement DESC);
+END
+$$;
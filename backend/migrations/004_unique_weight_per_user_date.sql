@@ -0,0 +1,30 @@
+-- Migration: One weight entry per user per day
+-- Description: Refuses to run while duplicate (user_id, date_of_measurement)
+-- rows exist and lists them (up to 50 groups) so they can be resolved by hand;
+-- nothing is deleted. Re-run once the duplicates are gone. (Messages are built
+-- with || rather than format/RAISE placeholders: the runner sends this file
+-- through the driver's paramstyle, which would claim the percent sign.)
+-- Date: 2026-10-16
+
+DO $$
+DECLARE
+    conflicts text;
+BEGIN
+    SELECT string_agg('user_id=' || user_id || ' date=' || date_of_measurement || ' weight_ids=' || ids::text, '; ')
+    INTO conflicts
+    FROM (
+        SELECT user_id, date_of_measurement, array_agg(id ORDER BY id) AS ids
+        FROM weights
+        GROUP BY user_id, date_of_measurement
+        HAVING count(*) > 1
+        ORDER BY user_id, date_of_measurement
+        LIMIT 50
+    ) dup;
+    IF conflicts IS NOT NULL THEN
+        RAISE EXCEPTION USING MESSAGE =
+            'Cannot create uq_weights_user_date; resolve duplicate weight entries first: ' || conflicts;
+    END IF;
+END
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_weights_user_date ON weights (user_id, date_of_measurement);
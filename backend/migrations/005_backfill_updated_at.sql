@@ -0,0 +1,30 @@
+-- migrate: no-transaction
+-- Migration: Backfill updated_at from created_at
+-- Description: Walks users and weights in primary-key ranges of 50k rows and
+-- commits after each range, so row locks stay short and WAL is written in
+-- small pieces; only rows still NULL are touched, so it is safe to re-run
+-- Date: 2026-10-16
+
+DO $$
+DECLARE
+    batch CONSTANT integer := 50000;
+    lo integer;
+    hi integer;
+BEGIN
+    SELECT min(id), max(id) INTO lo, hi FROM users;
+    WHILE lo <= hi LOOP
+        UPDATE users SET updated_at = created_at
+        WHERE id >= lo AND id < lo + batch AND updated_at IS NULL;
+        COMMIT;
+        lo := lo + batch;
+    END LOOP;
+
+    SELECT min(id), max(id) INTO lo, hi FROM weights;
+    WHILE lo <= hi LOOP
+        UPDATE weights SET updated_at = created_at
+        WHERE id >= lo AND id < lo + batch AND updated_at IS NULL;
+        COMMIT;
+        lo := lo + batch;
+    END LOOP;
+END
+$$;
@@ -0,0 +1,7 @@
+-- Migration: Per-user target_weights indexes
+-- Description: Serves "targets for user X, newest first" listings (ordered by
+-- date_of_target or created_date) with a backward index scan instead of a sort
+-- Date: 2026-10-16
+
+CREATE INDEX IF NOT EXISTS ix_target_weights_user_target_date ON target_weights (user_id, date_of_target DESC);
+CREATE INDEX IF NOT EXISTS ix_target_weights_user_created ON target_weights (user_id, created_date DESC);
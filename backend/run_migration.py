@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 """
 Simple migration runner for Railway database.
-Run this script to apply pending migrations.
+Run this script at deploy time to apply pending migrations from migrations/
+(the app applies anything still pending on startup as a fallback).
 
 Usage: python run_migration.py
 """
 import os
-import psycopg2
-from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from app.schema_migrations import MIGRATIONS_DIR, apply_pending_migrations
 
 # Get database URL from environment
 DATABASE_URL = os.getenv('DATABASE_URL')
@@ -16,31 +19,23 @@ if not DATABASE_URL:
     print("ERROR: DATABASE_URL environment variable not set")
     exit(1)
 
-# Read the migration file
-migration_file = Path(__file__).parent / 'migrations' / '002_add_updated_at_to_users.sql'
-
-if not migration_file.exists():
-    print(f"ERROR: Migration file not found: {migration_file}")
-    exit(1)
-
-print(f"Reading migration: {migration_file}")
-migration_sql = migration_file.read_text()
+print(f"Reading migrations from: {MIGRATIONS_DIR}")
 
-# Connect and run migration
+# Connect and run pending migrations
 print(f"Connecting to database...")
-conn = psycopg2.connect(DATABASE_URL)
-conn.autocommit = True
-cursor = conn.cursor()
+engine = create_engine(DATABASE_URL)
 
 try:
-    print("Running migration...")
-    cursor.execute(migration_sql)
-    print("✅ Migration completed successfully!")
+    print("Running migrations...")
+    applied = apply_pending_migrations(engine, raise_errors=True)
+    if applied:
+        print(f"✅ Applied: {', '.join(applied)}")
+    else:
+        print("✅ Database already up to date")
 except Exception as e:
     print(f"❌ Migration failed: {e}")
     exit(1)
 finally:
-    cursor.close()
-    conn.close()
+    engine.dispose()
 
 print("Done!")
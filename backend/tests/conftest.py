@@ -0,0 +1,82 @@
+"""
+Shared fixtures for the backend test suite.
+
+Runs against SQLite by default. Point TEST_DATABASE_URL at a throwaway
+PostgreSQL database to also run the tests marked ``postgres_only``; every
+table in it is dropped and recreated per test.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when app.config is imported, so configure the environment first
+_SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix="weight-tracker-tests-"), "test.db")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_SQLITE_PATH}")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app import models  # noqa: E402,F401
+
+
+def pytest_collection_modifyitems(config, items):
+    if engine.dialect.name == "postgresql":
+        return
+    skip = pytest.mark.skip(reason="needs TEST_DATABASE_URL pointing at PostgreSQL")
+    for item in items:
+        if "postgres_only" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    u = models.User(name="alice", email="alice@example.com", password_hash="x")
+    db.add(u)
+    db.commit()
+    return u
+
+
+@pytest.fixture
+def admin_user(db):
+    u = models.User(name="root", email="root@example.com", password_hash="x", is_admin=True)
+    db.add(u)
+    db.commit()
+    return u
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager counting statements sent to the database."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        counts = [0]
+
+        def on_execute(*args, **kwargs):
+            counts[0] += 1
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            yield counts
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+    return counter
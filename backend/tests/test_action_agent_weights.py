@@ -0,0 +1,90 @@
+"""
+ActionAgent weight writes: one entry per user per day.
+"""
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app import models
+from app.database import SessionLocal, engine
+from app.llm.agents import ActionAgent
+
+
+def _create(db, user, day, weight):
+    return ActionAgent(db, user).execute("user_create_weight", {"date_of_measurement": day, "weight": weight})
+
+
+def test_create_rejects_a_second_entry_for_the_same_day(db, user):
+    first = _create(db, user, "2024-01-01", 80)
+    assert first["date"] == "2024-01-01"
+
+    assert _create(db, user, "2024-01-01", 81) == {"error": "Weight entry already exists for 2024-01-01"}
+    assert db.query(models.Weight).count() == 1
+
+
+def test_update_rejects_moving_onto_a_taken_day(db, user):
+    _create(db, user, "2024-01-01", 80)
+    second = _create(db, user, "2024-01-02", 79)
+    agent = ActionAgent(db, user)
+
+    result = agent.execute("user_update_weight", {"weight_id": second["id"], "date_of_measurement": "2024-01-01"})
+    assert result == {"error": "Weight entry already exists for 2024-01-01"}
+
+    moved = agent.execute("user_update_weight", {"weight_id": second["id"], "date_of_measurement": "2024-01-03"})
+    assert moved["date"] == "2024-01-03"
+    missing = agent.execute("user_update_weight", {"weight_id": 999, "date_of_measurement": "2024-01-05"})
+    assert missing == {"error": "Weight entry not found"}
+
+
+@pytest.mark.postgres_only
+def test_duplicate_check_holds_without_the_unique_index(db, user):
+    # Migration 004 may still be pending (it refuses to run over duplicates)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE weights DROP CONSTRAINT uq_weights_user_date"))
+    _create(db, user, "2024-01-01", 80)
+    second = _create(db, user, "2024-01-02", 79)
+
+    assert _create(db, user, "2024-01-01", 81)["error"].startswith("Weight entry already exists")
+    result = ActionAgent(db, user).execute(
+        "user_update_weight", {"weight_id": second["id"], "date_of_measurement": "2024-01-01"}
+    )
+    assert result["error"].startswith("Weight entry already exists")
+    assert db.query(models.Weight).filter(models.Weight.date_of_measurement == date(2024, 1, 1)).count() == 1
+
+
+@pytest.mark.postgres_only
+def test_concurrent_duplicate_insert_maps_integrity_error(db, user):
+    uid = user.id
+    result = {}
+
+    def agent_insert():
+        session = SessionLocal()
+        try:
+            result["value"] = _create(session, session.get(models.User, uid), "2024-01-01", 81)
+        finally:
+            session.close()
+
+    # Another transaction holds an uncommitted row for the same day: the agent's NOT EXISTS
+    # check cannot see it, so its INSERT waits on the unique index and then violates it
+    with engine.connect() as other:
+        other.execute(
+            text("INSERT INTO weights (user_id, date_of_measurement, weight) VALUES (:u, '2024-01-01', 80)"),
+            {"u": uid},
+        )
+        worker = threading.Thread(target=agent_insert)
+        worker.start()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            waiting = other.execute(text(
+                "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"
+            )).scalar()
+            if waiting:
+                break
+            time.sleep(0.02)
+        other.commit()
+    worker.join(timeout=10)
+
+    assert result["value"] == {"error": "Weight entry already exists for 2024-01-01"}
@@ -0,0 +1,75 @@
+"""
+Admin user listing: keyset pagination over the primary key.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import models
+from app.auth import get_current_admin_user
+from app.database import get_db
+from app.routers import admin
+
+
+@pytest.fixture
+def client(db, admin_user):
+    app = FastAPI()
+    app.include_router(admin.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_admin_user] = lambda: admin_user
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def user_ids(db, admin_user):
+    for i in range(7):
+        db.add(models.User(name=f"user{i}", email=f"user{i}@example.com", password_hash="x"))
+    db.commit()
+    return [uid for (uid,) in db.query(models.User.id).order_by(models.User.id)]
+
+
+def _page(client, **params):
+    response = client.get("/api/admin/users", params=params)
+    assert response.status_code == 200
+    return [u["id"] for u in response.json()]
+
+
+def test_pages_follow_id_order_without_gaps_or_overlap(client, user_ids):
+    seen, after_id = [], 0
+    while True:
+        page = _page(client, limit=3, after_id=after_id)
+        if not page:
+            break
+        assert len(page) <= 3
+        seen.extend(page)
+        after_id = page[-1]
+
+    assert seen == user_ids
+
+
+def test_after_id_is_exclusive_and_past_the_end_is_empty(client, user_ids):
+    assert _page(client, after_id=user_ids[2]) == user_ids[3:]
+    assert _page(client, after_id=user_ids[-1]) == []
+
+
+def test_default_limit_is_100(client, db, user_ids):
+    for i in range(110):
+        db.add(models.User(name=f"bulk{i}", email=f"bulk{i}@example.com", password_hash="x"))
+    db.commit()
+
+    page = _page(client)
+    assert len(page) == 100
+    assert page[:len(user_ids)] == user_ids
+
+
+def test_page_rows_match_the_user_schema(client, user_ids):
+    first = client.get("/api/admin/users", params={"limit": 1}).json()[0]
+    assert first["id"] == user_ids[0]
+    assert first["name"] == "root" and first["is_admin"] is True
+    assert "password_hash" not in first
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": 501}, {"after_id": -1}])
+def test_out_of_range_parameters_are_rejected(client, params):
+    assert client.get("/api/admin/users", params=params).status_code == 422
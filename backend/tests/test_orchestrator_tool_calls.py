@@ -0,0 +1,70 @@
+"""
+Orchestrator tool fan-out: parallel read-only calls, serial writes.
+"""
+import threading
+import time
+
+from app.llm.agents import BaseAgent
+from app.llm.orchestrator import ChatOrchestrator
+
+
+class _Reader(BaseAgent):
+    name = "reader"
+    read_only = True
+
+    def __init__(self, db, user):
+        self.db = db
+        self.user = user
+
+    def execute(self, tool_name, args):
+        # Later calls finish first, so completion order differs from call order
+        time.sleep(args["delay"])
+        return {
+            "n": args["n"],
+            "user_id": self.user.id,
+            "thread": threading.current_thread().name,
+            "session": id(self.db),
+        }
+
+
+class _Writer(_Reader):
+    name = "writer"
+    read_only = False
+
+
+def _calls(tool, n):
+    return [(tool, {"n": i, "delay": (n - i) * 0.03}) for i in range(n)]
+
+
+def test_parallel_read_results_keep_call_order(db, user):
+    orch = ChatOrchestrator()
+    results = orch._run_tool_calls({"read": _Reader(db, user)}, _calls("read", 4), user, db)
+
+    assert [r["data"]["n"] for r in results] == [0, 1, 2, 3]
+    assert all(r["ok"] and r["tool"] == "read" for r in results)
+    assert all(r["data"]["user_id"] == user.id for r in results)
+    # Each call ran off the request thread, on its own session
+    assert all(r["data"]["thread"] != threading.current_thread().name for r in results)
+    assert id(db) not in {r["data"]["session"] for r in results}
+
+
+def test_batches_with_a_write_run_serially_on_the_request_session(db, user):
+    orch = ChatOrchestrator()
+    owners = {"read": _Reader(db, user), "write": _Writer(db, user)}
+    calls = _calls("read", 2) + [("write", {"n": 2, "delay": 0})]
+
+    results = orch._run_tool_calls(owners, calls, user, db)
+
+    assert [r["data"]["n"] for r in results] == [0, 1, 2]
+    assert {r["data"]["thread"] for r in results} == {threading.current_thread().name}
+    assert {r["data"]["session"] for r in results} == {id(db)}
+
+
+def test_unknown_tool_is_reported_in_place(db, user):
+    orch = ChatOrchestrator()
+    calls = [("read", {"n": 0, "delay": 0}), ("nope", {})]
+
+    results = orch._run_tool_calls({"read": _Reader(db, user)}, calls, user, db)
+
+    assert results[0]["ok"] is True
+    assert results[1] == {"tool": "nope", "ok": False, "data": {"error": "Unknown tool: nope"}}
@@ -0,0 +1,100 @@
+"""
+Versioned SQL migration runner: ordering, bookkeeping, stop-on-failure.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import schema_migrations
+
+
+@pytest.fixture
+def migrations_dir(tmp_path, monkeypatch):
+    path = tmp_path / "migrations"
+    path.mkdir()
+    monkeypatch.setattr(schema_migrations, "MIGRATIONS_DIR", path)
+    return path
+
+
+@pytest.fixture
+def mig_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _recorded(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+
+
+def _log(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT name FROM log ORDER BY rowid")).scalars().all()
+
+
+def test_applies_pending_files_in_version_order_once(migrations_dir, mig_engine):
+    # Written out of order on purpose; the runner sorts by file name
+    (migrations_dir / "011_second.sql").write_text("INSERT INTO log (name) VALUES ('011')")
+    (migrations_dir / "010_first.sql").write_text("INSERT INTO log (name) VALUES ('010')")
+    (migrations_dir / "009_create.sql").write_text("CREATE TABLE log (name TEXT)")
+    (migrations_dir / "notes.sql").write_text("this is not a migration")
+
+    assert schema_migrations.apply_pending_migrations(mig_engine) == ["009_create", "010_first", "011_second"]
+    assert _log(mig_engine) == ["010", "011"]
+
+    # Second run is a no-op
+    assert schema_migrations.apply_pending_migrations(mig_engine) == []
+    assert _log(mig_engine) == ["010", "011"]
+
+
+def test_new_tracking_table_records_baseline_versions_without_running_them(migrations_dir, mig_engine):
+    for version in schema_migrations._BASELINE_VERSIONS:
+        (migrations_dir / f"{version}.sql").write_text("SELECT missing_column FROM missing_table")
+
+    assert schema_migrations.apply_pending_migrations(mig_engine) == []
+    assert _recorded(mig_engine) == sorted(schema_migrations._BASELINE_VERSIONS)
+
+
+def test_stops_at_first_failure_and_retries_it_next_run(migrations_dir, mig_engine, capsys):
+    (migrations_dir / "010_create.sql").write_text("CREATE TABLE log (name TEXT)")
+    (migrations_dir / "011_broken.sql").write_text("INSERT INTO missing_table VALUES (1)")
+    (migrations_dir / "012_after.sql").write_text("INSERT INTO log (name) VALUES ('012')")
+
+    assert schema_migrations.apply_pending_migrations(mig_engine) == ["010_create"]
+    assert "011_broken" in capsys.readouterr().out
+    # 012 may depend on 011, so it must not have run
+    assert _log(mig_engine) == []
+    assert "012_after" not in _recorded(mig_engine)
+
+    (migrations_dir / "011_broken.sql").write_text("CREATE TABLE missing_table (id INTEGER)")
+    assert schema_migrations.apply_pending_migrations(mig_engine) == ["011_broken", "012_after"]
+    assert _log(mig_engine) == ["012"]
+
+
+def test_raise_errors_propagates_the_failure(migrations_dir, mig_engine):
+    (migrations_dir / "010_broken.sql").write_text("INSERT INTO missing_table VALUES (1)")
+    with pytest.raises(Exception):
+        schema_migrations.apply_pending_migrations(mig_engine, raise_errors=True)
+    assert "010_broken" not in _recorded(mig_engine)
+
+
+@pytest.mark.postgres_only
+def test_duplicate_weights_block_004_without_deleting_rows(db, user):
+    from app.database import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+        conn.execute(text("ALTER TABLE weights DROP CONSTRAINT uq_weights_user_date"))
+        conn.execute(
+            text("INSERT INTO weights (user_id, date_of_measurement, weight) VALUES (:u, '2024-01-01', 80), (:u, '2024-01-01', 81)"),
+            {"u": user.id},
+        )
+
+    applied = schema_migrations.apply_pending_migrations(engine)
+
+    assert "004_unique_weight_per_user_date" not in applied
+    assert "005_backfill_updated_at" not in applied
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM weights")).scalar() == 2
+    with pytest.raises(Exception, match="resolve duplicate weight entries"):
+        schema_migrations.apply_pending_migrations(engine, raise_errors=True)
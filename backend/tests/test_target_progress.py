@@ -0,0 +1,66 @@
+"""
+Target progress enrichment: weight lookups and query counts.
+"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from app import models
+from app.routers import admin, users
+
+
+def _add_weights(db, user, values, start=date(2024, 1, 1), step_days=10):
+    for i, value in enumerate(values):
+        db.add(models.Weight(user_id=user.id, date_of_measurement=start + timedelta(days=i * step_days), weight=value))
+    db.commit()
+
+
+def _add_targets(db, user, n):
+    for i in range(n):
+        db.add(models.TargetWeight(
+            user_id=user.id,
+            date_of_target=date(2024, 6, 1) + timedelta(days=i),
+            target_weight=80 - i,
+            status="active" if i % 2 else "completed",
+            created_date=date(2024, 1, 5) + timedelta(days=i * 7),
+        ))
+    db.commit()
+
+
+def test_admin_user_targets_query_count_is_independent_of_target_count(db, user, admin_user, count_queries):
+    _add_weights(db, user, [90, 88, 86, 85, 84])
+    _add_targets(db, user, 1)
+    uid = user.id
+    with count_queries() as few:
+        assert len(admin.get_user_targets(uid, admin_user=admin_user, db=db)) == 1
+
+    _add_targets(db, user, 9)
+    db.expire_all()
+    with count_queries() as many:
+        assert len(admin.get_user_targets(uid, admin_user=admin_user, db=db)) == 10
+
+    # Targets + weight history, however many targets there are
+    assert few[0] == many[0] == 2
+
+
+def test_series_and_per_query_lookups_agree(db, user):
+    _add_weights(db, user, [90, 88, 86])
+    _add_targets(db, user, 4)
+    series = users.get_weight_series(db, user.id)
+    for target in db.query(models.TargetWeight).all():
+        with_series = users.calculate_target_progress(85, target, db, weight_series=series)
+        per_query = users.calculate_target_progress(85, target, db)
+        assert with_series == per_query
+
+
+def test_missing_created_date_starts_from_first_weight(db, user, monkeypatch):
+    _add_weights(db, user, [90, 88, 85])
+    # TargetWithProgress requires created_date, so capture the computed fields instead
+    monkeypatch.setattr(users.schemas, "TargetWithProgress", lambda **fields: fields)
+    target = SimpleNamespace(
+        id=1, user_id=user.id, target_weight=80, status="active",
+        date_of_target=date(2030, 1, 1), created_date=None,
+    )
+    for series in (None, users.get_weight_series(db, user.id)):
+        progress = users.calculate_target_progress(85, target, db, weight_series=series)
+        assert progress["starting_weight"] == 90
+        assert progress["progress_percentage"] == 50
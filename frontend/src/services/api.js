@@ -93,7 +93,18 @@ export const targetAPI = {
 
 // Admin APIs
 export const adminAPI = {
-  listUsers: () => api.get('/api/admin/users'),
+  // The endpoint is keyset-paginated; walk every page so callers still get the full list
+  listUsers: async () => {
+    const pageSize = 500;
+    const users = [];
+    let afterId = 0;
+    for (;;) {
+      const { data } = await api.get('/api/admin/users', { params: { limit: pageSize, after_id: afterId } });
+      users.push(...data);
+      if (data.length < pageSize) return { data: users };
+      afterId = data[data.length - 1].id;
+    }
+  },
   createUser: (data, isAdmin = false) => api.post('/api/admin/users', data, { params: { is_admin: isAdmin } }),
   setAdmin: (userId, isAdmin) => api.put(`/api/admin/users/${userId}/admin`, null, { params: { is_admin: isAdmin } }),
   updateUser: (userId, data) => api.put(`/api/admin/users/${userId}`, data),